@@ -18,33 +18,17 @@ def cleanup_old_lists(days: int = 28) -> int:
 
     conn = sqlite3.connect(DB_PATH)
     try:
-        cursor = conn.cursor()
-
-        # Get count of lists to delete
-        cursor.execute(
-            'SELECT COUNT(*) FROM shopping_lists WHERE created_at < ?',
+        # Items are removed by the ON DELETE CASCADE foreign key
+        conn.execute('PRAGMA foreign_keys=ON')
+        cursor = conn.execute(
+            'DELETE FROM shopping_lists WHERE created_at < ?',
             (cutoff_str,)
         )
-        count = cursor.fetchone()[0]
-
-        if count > 0:
-            # Delete items first (foreign key constraint)
-            cursor.execute('''
-                DELETE FROM shopping_items
-                WHERE list_id IN (
-                    SELECT id FROM shopping_lists WHERE created_at < ?
-                )
-            ''', (cutoff_str,))
-
-            # Delete the lists
-            cursor.execute(
-                'DELETE FROM shopping_lists WHERE created_at < ?',
-                (cutoff_str,)
-            )
-
-            conn.commit()
-
-        return count
+        conn.commit()
+        # Bulk deletes leave a large WAL behind; fold it back into the
+        # main database while we have the connection open.
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return cursor.rowcount
     finally:
         conn.close()
 
@@ -0,0 +1,102 @@
+"""Shared fixtures for the Shoppr test suite."""
+
+import itertools
+import logging
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from main import app
+
+_test_db_ids = itertools.count()
+
+
+def find_item(list_data: dict, item_id: int) -> dict:
+    """Look an item up by id in a grouped get_shopping_list payload."""
+    return {
+        item['id']: item
+        for group in list_data['groups']
+        for item in group['items']
+    }[item_id]
+
+
+@pytest.fixture(autouse=True, scope="session")
+def quiet_logging():
+    """Silence app logging for the whole run; tests never assert on it."""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def temp_db(monkeypatch):
+    """Create a fresh shared in-memory database for testing."""
+    db_uri = f"file:test-db-{next(_test_db_ids)}?mode=memory&cache=shared"
+    # The anchor connection keeps the in-memory database alive for the
+    # duration of the test; pooled connections come and go around it.
+    anchor = sqlite3.connect(db_uri, uri=True)
+
+    # monkeypatch restores DB_PATH even if init_db raises
+    monkeypatch.setattr(database, "DB_PATH", db_uri)
+    database.init_db()
+
+    yield db_uri
+
+    anchor.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One shared test client: nothing here mutates client or app state."""
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def mock_llm_response():
+    """Mock LLM response data for testing (treated as read-only)."""
+    return [
+        {
+            "name": "Semi-skimmed milk",
+            "quantity": "2L",
+            "area": "dairy",
+            "area_order": 3
+        },
+        {
+            "name": "Bananas",
+            "quantity": "6",
+            "area": "produce",
+            "area_order": 1
+        },
+        {
+            "name": "Bread",
+            "quantity": None,
+            "area": "bakery",
+            "area_order": 2
+        }
+    ]
+
+
+@pytest.fixture(scope="session")
+def mock_llm_usage():
+    """Mock LLM usage stats (treated as read-only)."""
+    return {
+        "model": "gemini-2.5-flash-lite",
+        "input_tokens": 150,
+        "output_tokens": 75,
+        "cost": 0.000123
+    }
+
+
+@pytest.fixture(scope="session")
+def mock_list_data():
+    """Mock shopping list data (treated as read-only)."""
+    return [
+        {
+            "name": "Test Item",
+            "quantity": "1",
+            "area": "produce",
+            "area_order": 1
+        }
+    ]
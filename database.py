@@ -1,18 +1,26 @@
+import itertools
+import json
 import os
-import secrets
+import queue
 import sqlite3
 import string
+import sys
+import threading
 from contextlib import contextmanager
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 # Characters for generating short slugs (alphanumeric, no ambiguous chars)
 SLUG_CHARS = string.ascii_lowercase + string.digits
 SLUG_LENGTH = 5
 
+# Byte -> slug character translation table. The modulo introduces a tiny
+# bias towards the first few characters, which is fine for a slug namespace.
+_SLUG_TABLE = bytes(ord(SLUG_CHARS[byte % len(SLUG_CHARS)]) for byte in range(256))
+
 
 def generate_slug() -> str:
     """Generate a random 5-character alphanumeric slug."""
-    return ''.join(secrets.choice(SLUG_CHARS) for _ in range(SLUG_LENGTH))
+    return os.urandom(SLUG_LENGTH).translate(_SLUG_TABLE).decode('ascii')
 
 # Get database path from environment variable, default to local directory
 DB_PATH = os.getenv('DB_PATH', 'shopping.db')
@@ -22,18 +30,110 @@ if os.path.dirname(DB_PATH):
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
 
+# Per-connection tuning pragmas. journal_mode=WAL is persistent (set once in
+# init_db) but the rest must be re-applied on every new connection.
+CONNECTION_PRAGMAS = '''
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA foreign_keys=ON;
+PRAGMA busy_timeout=5000;
+PRAGMA mmap_size=268435456;
+'''
+
+
+# Pool of pre-opened connections so small queries skip the connect/pragma
+# setup cost. Connections are shared across threads (WAL + busy_timeout
+# handle writer serialization). The pool is rebuilt if DB_PATH changes,
+# which the tests rely on.
+POOL_SIZE = 8
+
+_pool: queue.LifoQueue = queue.LifoQueue(maxsize=POOL_SIZE)
+_pool_path: Optional[str] = None
+_pool_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    # isolation_level=None leaves transaction control to write_tx below
+    # instead of sqlite3's implicit BEGIN-on-first-write.
+    conn = sqlite3.connect(
+        DB_PATH, check_same_thread=False, isolation_level=None,
+        cached_statements=256,
+        # URI paths let the tests point at a shared in-memory database
+        uri=DB_PATH.startswith('file:')
+    )
+    conn.row_factory = sqlite3.Row
+    conn.executescript(CONNECTION_PRAGMAS)
+    return conn
+
+
+def _drain_pool():
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    global _pool_path
+    with _pool_lock:
+        if _pool_path != DB_PATH:
+            _drain_pool()
+            _pool_path = DB_PATH
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = _connect()
     try:
         yield conn
     finally:
-        conn.close()
+        # Never return a connection mid-transaction to the pool.
+        if conn.in_transaction:
+            conn.rollback()
+        with _pool_lock:
+            if _pool_path == DB_PATH:
+                try:
+                    _pool.put_nowait(conn)
+                    conn = None
+                except queue.Full:
+                    pass
+        if conn is not None:
+            conn.close()
+
+
+@contextmanager
+def write_tx(conn):
+    """Run a write transaction: commit on success, roll back on error.
+
+    BEGIN IMMEDIATE takes the write lock upfront, so a transaction never
+    has to upgrade from a read lock mid-flight (the case that surfaces
+    SQLITE_BUSY when two writers race).
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    else:
+        conn.execute('COMMIT')
+
+
+# Bump when adding a migration below; databases at this version skip the
+# migration checks entirely on startup.
+SCHEMA_VERSION = 1
 
 
 def init_db():
     with get_db() as conn:
+        # WAL avoids an fsync per commit and lets readers run alongside a
+        # writer. It's persistent, so it only needs setting here.
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA journal_size_limit=67108864')
+
         conn.execute('''
         CREATE TABLE IF NOT EXISTS shopping_lists (
             id TEXT PRIMARY KEY,
@@ -46,22 +146,26 @@ def init_db():
         )
         ''')
 
-        # Ensure versioning and raw_input columns exist (migration for existing DBs)
-        cursor = conn.execute('PRAGMA table_info(shopping_lists)')
-        columns = {row[1] for row in cursor.fetchall()}
-        if 'updated_at' not in columns:
-            # SQLite doesn't support non-constant defaults in ALTER TABLE
-            conn.execute('ALTER TABLE shopping_lists ADD COLUMN updated_at TIMESTAMP')
-            # Update existing rows to set the timestamp
-            conn.execute('UPDATE shopping_lists SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL')
-        if 'revision' not in columns:
-            conn.execute(
-                'ALTER TABLE shopping_lists ADD COLUMN revision INTEGER NOT NULL DEFAULT 0'
-            )
-        if 'raw_input' not in columns:
-            conn.execute('ALTER TABLE shopping_lists ADD COLUMN raw_input TEXT')
-        if 'input_type' not in columns:
-            conn.execute('ALTER TABLE shopping_lists ADD COLUMN input_type TEXT')
+        schema_version = conn.execute('PRAGMA user_version').fetchone()[0]
+
+        if schema_version < 1:
+            # Ensure versioning and raw_input columns exist (migration for
+            # DBs created before the columns were added to CREATE TABLE)
+            cursor = conn.execute('PRAGMA table_info(shopping_lists)')
+            columns = {row[1] for row in cursor.fetchall()}
+            if 'updated_at' not in columns:
+                # SQLite doesn't support non-constant defaults in ALTER TABLE
+                conn.execute('ALTER TABLE shopping_lists ADD COLUMN updated_at TIMESTAMP')
+                # Update existing rows to set the timestamp
+                conn.execute('UPDATE shopping_lists SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL')
+            if 'revision' not in columns:
+                conn.execute(
+                    'ALTER TABLE shopping_lists ADD COLUMN revision INTEGER NOT NULL DEFAULT 0'
+                )
+            if 'raw_input' not in columns:
+                conn.execute('ALTER TABLE shopping_lists ADD COLUMN raw_input TEXT')
+            if 'input_type' not in columns:
+                conn.execute('ALTER TABLE shopping_lists ADD COLUMN input_type TEXT')
 
         conn.execute('''
         CREATE TABLE IF NOT EXISTS shopping_items (
@@ -73,139 +177,279 @@ def init_db():
             item_order INTEGER NOT NULL,
             quantity TEXT,
             checked BOOLEAN DEFAULT FALSE,
-            FOREIGN KEY (list_id) REFERENCES shopping_lists (id)
+            FOREIGN KEY (list_id) REFERENCES shopping_lists (id) ON DELETE CASCADE
         )
         ''')
 
+        # Migrate pre-CASCADE databases: SQLite can't alter a foreign key in
+        # place, so rebuild the items table once if the old FK is found.
+        if schema_version < 1:
+            fk = conn.execute('PRAGMA foreign_key_list(shopping_items)').fetchone()
+        else:
+            fk = None
+        if fk is not None and fk['on_delete'] != 'CASCADE':
+            conn.executescript('''
+            PRAGMA foreign_keys=OFF;
+            BEGIN;
+            CREATE TABLE shopping_items_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                list_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                area TEXT NOT NULL,
+                area_order INTEGER NOT NULL,
+                item_order INTEGER NOT NULL,
+                quantity TEXT,
+                checked BOOLEAN DEFAULT FALSE,
+                FOREIGN KEY (list_id) REFERENCES shopping_lists (id) ON DELETE CASCADE
+            );
+            INSERT INTO shopping_items_new SELECT * FROM shopping_items;
+            DROP TABLE shopping_items;
+            ALTER TABLE shopping_items_new RENAME TO shopping_items;
+            COMMIT;
+            PRAGMA foreign_keys=ON;
+            ''')
+
+        # Covering index for get_shopping_list: the WHERE + ORDER BY become a
+        # single index range scan and every selected column (id is the rowid)
+        # is answered from the index with no sort step.
         conn.execute('''
-        CREATE INDEX IF NOT EXISTS idx_items_list_id
-        ON shopping_items(list_id)
+        CREATE INDEX IF NOT EXISTS idx_items_list_order
+        ON shopping_items(list_id, area_order, item_order, name, quantity, checked)
         ''')
 
+        # Superseded by idx_items_list_order (same leading column)
+        conn.execute('DROP INDEX IF EXISTS idx_items_list_id')
+
         conn.execute('''
         CREATE INDEX IF NOT EXISTS idx_items_order
         ON shopping_items(area_order, item_order)
         ''')
 
+        # Record that all migrations up to SCHEMA_VERSION have run, so the
+        # checks above are skipped on subsequent starts.
+        conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+
         conn.commit()
 
 
-def create_shopping_list(
+# Bulk item insert: the list is bound once as a JSON array and expanded
+# server-side. json_each's key column is the 0-based array position, so
+# item_order needs no Python-side enumerate (and no parameter-count limit).
+ITEMS_INSERT_SQL = '''
+INSERT INTO shopping_items
+(list_id, name, area, area_order, item_order, quantity, checked)
+SELECT ?, json_extract(value, '$.name'), json_extract(value, '$.area'),
+       json_extract(value, '$.area_order'), key,
+       json_extract(value, '$.quantity'), json_extract(value, '$.checked')
+FROM json_each(?)
+'''
+
+LIST_INSERT_SQL = (
+    'INSERT INTO shopping_lists (id, supermarket, raw_input, input_type) '
+    'VALUES (?, ?, ?, ?)'
+)
+
+LIST_WITH_ITEMS_SQL = '''
+SELECT l.id AS list_id, l.supermarket, l.raw_input, l.input_type,
+       l.updated_at, l.revision,
+       i.id AS item_id, i.name, i.area, i.area_order, i.quantity, i.checked
+FROM shopping_lists l
+LEFT JOIN shopping_items i ON i.list_id = l.id
+WHERE l.id = ?
+ORDER BY i.area_order, i.item_order
+'''
+
+
+ITEMS_INSERT_RETURNING_SQL = ITEMS_INSERT_SQL + '''
+RETURNING id AS item_id, name, area, area_order, item_order, quantity, checked
+'''
+
+
+def _insert_items(conn, list_id, items):
+    """Bulk-insert item dicts (name, area, area_order, quantity, checked)
+    with a single statement. Caller is responsible for the transaction."""
+    conn.execute(ITEMS_INSERT_SQL, (list_id, json.dumps(items)))
+
+
+def _group_item_rows(rows) -> Tuple[List[dict], int, int]:
+    """Group item rows (ordered by area_order, item_order) by area.
+
+    Tallies progress in the same pass. Rows need item_id, name, area,
+    area_order, quantity and checked keys. Returns (groups, total,
+    checked_count).
+    """
+    total = 0
+    checked_count = 0
+    groups = []
+    for (area_order, area), group_rows in itertools.groupby(
+        rows, key=lambda row: (row['area_order'], row['area'])
+    ):
+        group_items = []
+        for row in group_rows:
+            # == avoids a bool() function-call dispatch per row
+            checked = row['checked'] == 1
+            total += 1
+            checked_count += checked
+            group_items.append({
+                'id': row['item_id'],
+                'name': row['name'],
+                'quantity': row['quantity'],
+                'checked': checked
+            })
+        groups.append({
+            # Intern the area key: the same handful of category strings come
+            # back from SQLite on every read, and interning lets the display
+            # name lookups in main.py hit the identity fast path
+            'area': sys.intern(area),
+            'area_order': area_order,
+            'items': group_items
+        })
+    return groups, total, checked_count
+
+
+def maintenance():
+    """Truncate the WAL and refresh planner statistics.
+
+    Long-running processes otherwise accumulate an ever-growing WAL file
+    between automatic checkpoints. Cheap when there's nothing to do, so
+    safe to call from startup or a periodic task.
+    """
+    with get_db() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('PRAGMA optimize')
+
+
+def create_shopping_list_data(
     items: List[dict],
     supermarket: Optional[str] = None,
     raw_input: Optional[str] = None,
     input_type: Optional[str] = None
-) -> str:
-    """Create a new shopping list with items."""
+) -> dict:
+    """Create a new shopping list and return it in get_shopping_list shape.
+
+    The inserts themselves report everything the response needs (via
+    RETURNING), so callers building a response from a fresh create can
+    skip the follow-up get_shopping_list query entirely.
+    """
     list_id = generate_slug()
 
-    with get_db() as conn:
-        conn.execute(
-            'INSERT INTO shopping_lists (id, supermarket, raw_input, input_type) VALUES (?, ?, ?, ?)',
-            (list_id, supermarket, raw_input, input_type)
-        )
+    rows = [
+        {'name': item['name'], 'area': item['area'],
+         'area_order': item['area_order'], 'quantity': item.get('quantity'),
+         'checked': False}
+        for item in items
+    ]
 
-        for i, item in enumerate(items):
-            conn.execute('''
-            INSERT INTO shopping_items
-            (list_id, name, area, area_order, item_order, quantity, checked)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                list_id,
-                item['name'],
-                item['area'],
-                item['area_order'],
-                i,
-                item.get('quantity'),
-                False
-            ))
+    with get_db() as conn:
+        # Single transaction: one fsync for the list row and all its items,
+        # instead of one per statement.
+        with write_tx(conn):
+            list_row = conn.execute(
+                LIST_INSERT_SQL + ' RETURNING updated_at, revision',
+                (list_id, supermarket, raw_input, input_type)
+            ).fetchone()
+            inserted = conn.execute(
+                ITEMS_INSERT_RETURNING_SQL, (list_id, json.dumps(rows))
+            ).fetchall()
+
+    # RETURNING row order is unspecified; restore display order
+    inserted.sort(key=lambda row: (row['area_order'], row['item_order']))
+    groups, total, checked_count = _group_item_rows(inserted)
+
+    return {
+        'list_id': list_id,
+        'supermarket': supermarket,
+        'raw_input': raw_input,
+        'input_type': input_type,
+        'updated_at': list_row['updated_at'],
+        'revision': list_row['revision'],
+        'progress': {'total': total, 'checked': checked_count},
+        'groups': groups
+    }
 
-        conn.commit()
 
-    return list_id
+def create_shopping_list(
+    items: List[dict],
+    supermarket: Optional[str] = None,
+    raw_input: Optional[str] = None,
+    input_type: Optional[str] = None
+) -> str:
+    """Create a new shopping list with items."""
+    return create_shopping_list_data(items, supermarket, raw_input, input_type)['list_id']
 
 
 def get_shopping_list(list_id: str) -> Optional[dict]:
     """Get a shopping list with all items grouped by area."""
     with get_db() as conn:
-        # Check if list exists and get supermarket
-        list_row = conn.execute(
-            'SELECT id, supermarket, raw_input, input_type, updated_at, revision FROM shopping_lists WHERE id = ?',
+        # One JOIN'd query for the list and its items, already in display
+        # order, so grouping is a single linear pass below.
+        rows = conn.execute(LIST_WITH_ITEMS_SQL, (list_id,)).fetchall()
+
+    if not rows:
+        return None
+
+    list_row = rows[0]
+
+    # Build groups and tally progress in the same pass, so callers that
+    # want both contents and checked/total counts need only this query.
+    total = 0
+    checked_count = 0
+    groups = []
+    if list_row['item_id'] is not None:
+        groups, total, checked_count = _group_item_rows(rows)
+
+    return {
+        'list_id': list_row['list_id'],
+        'supermarket': list_row['supermarket'],
+        'raw_input': list_row['raw_input'],
+        'input_type': list_row['input_type'],
+        'updated_at': list_row['updated_at'],
+        'revision': list_row['revision'],
+        'progress': {'total': total, 'checked': checked_count},
+        'groups': groups
+    }
+
+
+def get_items_raw(list_id: str) -> List[dict]:
+    """Get a list's items as flat dicts, skipping the grouping pass.
+
+    For callers (mainly tests) that just want to look an item up by id
+    without the join against shopping_lists or the per-area grouping.
+    """
+    with get_db() as conn:
+        rows = conn.execute(
+            '''
+            SELECT id, name, area, area_order, item_order, quantity, checked
+            FROM shopping_items WHERE list_id = ?
+            ''',
             (list_id,)
-        ).fetchone()
-
-        if not list_row:
-            return None
-
-        # Get all items ordered by area_order then item_order
-        items = conn.execute('''
-        SELECT id, name, area, area_order, quantity, checked
-        FROM shopping_items
-        WHERE list_id = ?
-        ORDER BY area_order, item_order
-        ''', (list_id,)).fetchall()
-
-        # Group items by area
-        groups = {}
-        for item in items:
-            area = item['area']
-            if area not in groups:
-                groups[area] = {
-                    'area': area,
-                    'area_order': item['area_order'],
-                    'items': []
-                }
-            groups[area]['items'].append({
-                'id': item['id'],
-                'name': item['name'],
-                'quantity': item['quantity'],
-                'checked': bool(item['checked'])
-            })
-
-        # Sort groups by area_order and convert to list
-        sorted_groups = sorted(groups.values(), key=lambda g: g['area_order'])
-
-        return {
-            'list_id': list_row['id'],
-            'supermarket': list_row['supermarket'],
-            'raw_input': list_row['raw_input'],
-            'input_type': list_row['input_type'],
-            'updated_at': list_row['updated_at'],
-            'revision': list_row['revision'],
-            'groups': sorted_groups
-        }
+        ).fetchall()
+    return [dict(row) for row in rows]
 
 
 def update_item_status(list_id: str, item_id: int, checked: bool) -> Optional[int]:
     """Update an item's checked status and return the resulting list revision."""
     with get_db() as conn:
-        # Verify the item belongs to the list
-        item = conn.execute('''
-        SELECT id FROM shopping_items
-        WHERE id = ? AND list_id = ?
-        ''', (item_id, list_id)).fetchone()
-
-        if not item:
-            return None
-
-        conn.execute(
-            'UPDATE shopping_items SET checked = ? WHERE id = ?',
-            (checked, item_id)
-        )
-        # Increment the revision in the same transaction as the item change.
-        conn.execute(
-            '''
-            UPDATE shopping_lists
-            SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1
-            WHERE id = ?
-            ''',
-            (list_id,)
-        )
-        revision = conn.execute(
-            'SELECT revision FROM shopping_lists WHERE id = ?',
-            (list_id,)
-        ).fetchone()['revision']
-        conn.commit()
+        with write_tx(conn):
+            # The WHERE clause doubles as the ownership check: rowcount == 0
+            # means the item doesn't exist or belongs to another list.
+            cursor = conn.execute(
+                'UPDATE shopping_items SET checked = ? WHERE id = ? AND list_id = ?',
+                (checked, item_id, list_id)
+            )
+            if cursor.rowcount == 0:
+                return None
+
+            # Increment the revision in the same transaction as the item change.
+            revision = conn.execute(
+                '''
+                UPDATE shopping_lists
+                SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1
+                WHERE id = ?
+                RETURNING revision
+                ''',
+                (list_id,)
+            ).fetchone()['revision']
         return revision
 
 
@@ -267,60 +511,51 @@ def update_shopping_list(list_id: str, new_items: List[dict], changes: dict) ->
     Returns:
         The resulting list revision if successful, otherwise None
     """
-    with get_db() as conn:
-        # Verify list exists
-        list_row = conn.execute(
-            'SELECT id FROM shopping_lists WHERE id = ?',
-            (list_id,)
-        ).fetchone()
+    rows = [
+        {'name': item['name'], 'area': item['area'],
+         'area_order': item['area_order'], 'quantity': item.get('quantity'),
+         'checked': False}
+        for item in new_items
+    ]
 
-        if not list_row:
-            return None
-
-        # Get existing items with their checked status
-        existing_items = conn.execute('''
-        SELECT name, checked FROM shopping_items WHERE list_id = ?
-        ''', (list_id,)).fetchall()
-
-        # Create a map of item names to checked status (case-insensitive)
-        checked_status = {item['name'].lower(): bool(item['checked']) for item in existing_items}
-
-        # Delete all existing items
-        conn.execute('DELETE FROM shopping_items WHERE list_id = ?', (list_id,))
-
-        # Insert new items, preserving checked status where names match
-        for i, item in enumerate(new_items):
-            item_name_lower = item['name'].lower()
-            # Preserve checked status if item existed before
-            was_checked = checked_status.get(item_name_lower, False)
-
-            conn.execute('''
-            INSERT INTO shopping_items
-            (list_id, name, area, area_order, item_order, quantity, checked)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                list_id,
-                item['name'],
-                item['area'],
-                item['area_order'],
-                i,
-                item.get('quantity'),
-                was_checked
-            ))
-
-        # Increment the revision in the same transaction as the list change.
-        conn.execute(
-            '''
-            UPDATE shopping_lists
-            SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1
-            WHERE id = ?
-            ''',
-            (list_id,)
-        )
-        revision = conn.execute(
-            'SELECT revision FROM shopping_lists WHERE id = ?',
-            (list_id,)
-        ).fetchone()['revision']
+    with get_db() as conn:
+        # Delete, re-insert and bump the revision in one transaction (and
+        # therefore one fsync).
+        with write_tx(conn):
+            # The revision bump doubles as the existence check: no RETURNING
+            # row means there is no such list, so nothing below runs.
+            revision_row = conn.execute(
+                '''
+                UPDATE shopping_lists
+                SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1
+                WHERE id = ?
+                RETURNING revision
+                ''',
+                (list_id,)
+            ).fetchone()
+            if revision_row is None:
+                return None
+
+            # Preserve checked status across the rewrite with set logic in
+            # SQLite rather than round-tripping names through a Python map
+            # (case-insensitive name match, as before).
+            conn.execute(
+                '''
+                CREATE TEMP TABLE _prev_checked AS
+                SELECT lower(name) AS name FROM shopping_items
+                WHERE list_id = ? AND checked = 1
+                ''',
+                (list_id,)
+            )
+            conn.execute('DELETE FROM shopping_items WHERE list_id = ?', (list_id,))
+            _insert_items(conn, list_id, rows)
+            conn.execute(
+                '''
+                UPDATE shopping_items SET checked = 1
+                WHERE list_id = ? AND lower(name) IN (SELECT name FROM _prev_checked)
+                ''',
+                (list_id,)
+            )
+            conn.execute('DROP TABLE _prev_checked')
 
-        conn.commit()
-        return revision
+        return revision_row['revision']
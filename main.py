@@ -1,21 +1,29 @@
-import base64
 import asyncio
-import json
+import difflib
+import hashlib
+import logging
+import logging.handlers
 import os
 import re
-import time
+import sqlite3
+from queue import SimpleQueue
 from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Optional, Dict, Any, Tuple, Set
 from contextlib import asynccontextmanager
+import orjson
+import pybase64
 from dotenv import load_dotenv
 from openrouter_client import OpenRouterClient
-from fastapi import FastAPI, HTTPException, Response, Request
+from fastapi import FastAPI, File, Form, HTTPException, Response, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fpdf import FPDF
 from pydantic import BaseModel
-from weasyprint import HTML
 
 import database
 
@@ -25,18 +33,72 @@ BASE_DIR = Path(__file__).resolve().parent
 # Load environment variables from .env file
 load_dotenv(BASE_DIR / ".env", override=True)
 
+log = logging.getLogger(__name__)
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+_log_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def _setup_logging() -> None:
+    """Route log records through a background listener thread.
+
+    Handlers write to stdout with the GIL held; under concurrency that
+    synchronous write() can block request handlers behind a slow pipe.
+    A QueueHandler makes emission a lock-free enqueue, and the listener
+    thread does the actual I/O. LOG_LEVEL controls verbosity (raw LLM
+    responses only appear at DEBUG).
+    """
+    global _log_listener, _log_handler
+    if _log_listener is not None:
+        return
+    queue: SimpleQueue = SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    _log_listener = logging.handlers.QueueListener(queue, stream_handler)
+    _log_listener.start()
+    _log_handler = logging.handlers.QueueHandler(queue)
+    root = logging.getLogger()
+    root.addHandler(_log_handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+
 # Initialize FastAPI app
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global _log_listener
     # Startup: Initialize the database
-    time.sleep(2)  # Allow volume mounting in Docker
-    print(f"Starting application with database path: {os.getenv('DB_PATH', 'shopping.db')}")
-    database.init_db()
+    _setup_logging()
+    log.info("Starting application with database path: %s", os.getenv('DB_PATH', 'shopping.db'))
+    # The Docker volume can mount a moment after the process starts; retry
+    # with backoff instead of a fixed sleep so a ready DB costs nothing
+    for attempt in range(6):
+        try:
+            database.init_db()
+            break
+        except sqlite3.OperationalError:
+            if attempt == 5:
+                raise
+            log.warning("Database not ready, retrying (attempt %d)", attempt + 1)
+            await asyncio.sleep(0.1 * (2 ** attempt))
+    database.maintenance()
+    # Pre-warm the prompt and static-page caches so no request pays the
+    # first disk read
+    for supermarket in (*SUPERMARKETS, None):
+        _categorize_system_message(supermarket)
+        _edit_system_message(supermarket)
+    for page in ("index.html", "manifest.json", "sw.js"):
+        _static_page(page)
     yield
-    # Shutdown: Cleanup if needed
-    # Add any shutdown logic here if required
+    # Shutdown: drain queued records and detach, so a restarted lifespan
+    # (tests) can set up cleanly without duplicate handlers
+    if _log_listener is not None:
+        _log_listener.stop()
+        logging.getLogger().removeHandler(_log_handler)
+        _log_listener = None
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -47,12 +109,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses: list JSON is full of repeated keys and area
+# names and shrinks several-fold, which matters for a PWA on mobile data.
+# Small payloads (item updates, version polls) skip compression entirely.
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Get environment variables
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL_PREFIX = os.getenv("OPENROUTER_MODEL_PREFIX", "")
 MODEL_NAME = os.getenv("LLM_MODEL", "google/gemini-2.5-flash-lite")
 VISION_MODEL_NAME = os.getenv("LLM_VISION_MODEL", "google/gemini-2.5-flash")
+# Debug escape hatch: set IMAGE_TWO_STAGE=1 to go back to separate OCR and
+# categorization calls instead of the combined vision call
+IMAGE_TWO_STAGE = os.getenv("IMAGE_TWO_STAGE", "").lower() in ("1", "true", "yes")
 
 # Validate configuration
 if not OPENROUTER_API_KEY:
@@ -65,8 +135,9 @@ openrouter_client = OpenRouterClient(
     model_prefix=OPENROUTER_MODEL_PREFIX
 )
 
-# Supermarket options
-SUPERMARKETS = {
+# Supermarket options (read-only lookup tables; MappingProxyType keeps
+# request handlers from mutating them by accident)
+SUPERMARKETS = MappingProxyType({
     "tesco": "Tesco",
     "sainsburys": "Sainsbury's",
     "asda": "Asda",
@@ -75,10 +146,10 @@ SUPERMARKETS = {
     "lidl": "Lidl",
     "waitrose": "Waitrose",
     "ms": "M&S",
-}
+})
 
 # Area display names
-AREA_DISPLAY_NAMES = {
+AREA_DISPLAY_NAMES = MappingProxyType({
     "produce": "Fruit & Veg",
     "bakery": "Bakery",
     "dairy": "Dairy & Eggs",
@@ -98,7 +169,7 @@ AREA_DISPLAY_NAMES = {
     "pet": "Pet",
     "world_foods": "World Foods",
     "other": "Other",
-}
+})
 
 
 # Pydantic models
@@ -107,11 +178,6 @@ class ProcessTextRequest(BaseModel):
     supermarket: Optional[str] = None
 
 
-class ProcessImageRequest(BaseModel):
-    image: str  # Base64-encoded image
-    supermarket: Optional[str] = None
-
-
 class ShoppingItem(BaseModel):
     id: int
     name: str
@@ -196,27 +262,202 @@ class ListEventBroker:
 
 list_event_broker = ListEventBroker()
 
+# In-process cache of serialized GET /api/list responses, keyed by slug.
+# A list only changes through update_item and edit_list, which drop the
+# entry; repeat GETs (shared lists being polled by several shoppers) then
+# skip SQLite and Pydantic entirely. Cleared wholesale at the size cap —
+# entries are cheap to rebuild. Per-process only; a multi-worker deploy
+# would need a shared store instead.
+_LIST_CACHE_MAX = 1024
+_list_cache: Dict[str, Tuple[int, bytes]] = {}
+# Revision floors for lists invalidated while a cache-miss read was in
+# flight: a miss only stores its body if the revision it read is at least
+# this floor, so a mutation landing between the DB read and the store
+# cannot freeze an older body into the cache. Entries are dropped once a
+# fresh-enough body is stored.
+_list_stale_floor: Dict[str, int] = {}
+
+
+def _invalidate_list_cache(list_id: str, revision: int) -> None:
+    """Drop the cached GET payload for a list after a mutation."""
+    _list_cache.pop(list_id, None)
+    _list_stale_floor[list_id] = revision
+
+
+def _store_list_cache(list_id: str, revision: int, body: bytes) -> None:
+    """Cache a serialized body unless a newer mutation has been seen.
+
+    Runs on the event loop with no awaits, so the checks and the store
+    are atomic with respect to _invalidate_list_cache.
+    """
+    if revision < _list_stale_floor.get(list_id, 0):
+        return
+    cached = _list_cache.get(list_id)
+    if cached is not None and cached[0] >= revision:
+        return
+    if len(_list_cache) >= _LIST_CACHE_MAX:
+        _list_cache.clear()
+    _list_cache[list_id] = (revision, body)
+    _list_stale_floor.pop(list_id, None)
+
+
+class BatchScheduler:
+    """Coalesce concurrent categorization requests into shared LLM calls.
+
+    Requests arriving within a short window are grouped by supermarket and
+    sent as one multi-list prompt, amortising the LLM round-trip and the
+    large store-layout system prompt across them. Results come back via
+    per-request futures, so callers just await submit().
+    """
+
+    def __init__(self, max_batch: int = 8, max_wait: float = 0.03):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # In-flight dispatch tasks, referenced so the loop can't GC them
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, items_text: str, supermarket: Optional[str]) -> Tuple[List[dict], Dict[str, Any]]:
+        """Queue one categorization request and wait for its result."""
+        # The worker starts lazily and is rebuilt if the running loop has
+        # changed (the test client uses a fresh loop per request).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        elif self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+        future: asyncio.Future = loop.create_future()
+        await self.queue.put((items_text, supermarket, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # One LLM call per supermarket group (the system prompt differs)
+            groups: Dict[Optional[str], List[Tuple[str, asyncio.Future]]] = defaultdict(list)
+            for items_text, supermarket, future in batch:
+                groups[supermarket].append((items_text, future))
+
+            # Fire each group off as its own task rather than awaiting it:
+            # the worker goes straight back to batching, so one slow LLM
+            # call (or one supermarket's group) never stalls the others.
+            for supermarket, entries in groups.items():
+                task = loop.create_task(self._dispatch_group(supermarket, entries))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch_group(self, supermarket: Optional[str], entries: List[Tuple[str, asyncio.Future]]):
+        try:
+            if len(entries) == 1:
+                results = [await asyncio.to_thread(
+                    process_items_with_llm, entries[0][0], supermarket
+                )]
+            else:
+                texts = [items_text for items_text, _ in entries]
+                item_lists, usage_stats = await asyncio.to_thread(
+                    process_items_batch_with_llm, texts, supermarket
+                )
+                results = [(items, usage_stats) for items in item_lists]
+        except Exception as exc:
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(entries, results):
+            if not future.done():
+                future.set_result(result)
+
+
+llm_batcher = BatchScheduler()
+
 
 def format_sse_event(event: Dict[str, Any]) -> str:
     """Serialize a list event using the Server-Sent Events wire format."""
-    return f"event: list-change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+    return f"event: list-change\ndata: {orjson.dumps(event).decode()}\n\n"
 
 
+# Compiled once at import: these run on every LLM response / list URL
+_FENCE_START_RE = re.compile(r"^```(?:json)?\s*\n?", re.MULTILINE)
+_FENCE_END_RE = re.compile(r"\n?```\s*$", re.MULTILINE)
 def strip_markdown_code_blocks(text: str) -> str:
     """Remove markdown code blocks from text."""
-    text = re.sub(r"^```(?:json)?\s*\n?", "", text, flags=re.MULTILINE)
-    text = re.sub(r"\n?```\s*$", "", text, flags=re.MULTILINE)
+    text = _FENCE_START_RE.sub("", text)
+    text = _FENCE_END_RE.sub("", text)
     return text.strip()
 
 
 def is_valid_slug(slug: str) -> bool:
-    """Check if slug is a valid 5-character alphanumeric string."""
-    return bool(re.match(r'^[a-z0-9]{5}$', slug))
+    """Check if slug is a valid 5-character alphanumeric string.
+
+    Plain string-method checks, measurably faster than the compiled
+    regex they replace for a pattern this small. The lower() comparison
+    (rather than islower(), which is False for all-digit slugs) keeps
+    the accepted set exactly [a-z0-9]{5}.
+    """
+    return len(slug) == 5 and slug.isascii() and slug.isalnum() and slug == slug.lower()
+
+
+def validate_llm_items(items: List[dict]) -> None:
+    """Check each LLM item has the fields the database insert needs.
+
+    Inlined membership tests instead of all(...) over a tuple: the
+    generator expression allocated per item added up on large lists.
+    """
+    for item in items:
+        if not ("name" in item and "area" in item and "area_order" in item):
+            raise HTTPException(status_code=500, detail="Invalid item format from LLM")
+
+
+def parse_llm_json(raw_response: str):
+    """Parse the JSON payload out of an LLM response.
+
+    Slices from the outermost bracket pair rather than regex-stripping
+    markdown fences: when the model wraps its answer in ```json blocks
+    (the common case) this is a single find/rfind instead of two
+    MULTILINE regex scans over the whole response. The fence-strip path
+    remains as the fallback for anything the fast path can't place.
+    """
+    array_start = raw_response.find('[')
+    object_start = raw_response.find('{')
+    if object_start == -1 or (array_start != -1 and array_start < object_start):
+        start, end = array_start, raw_response.rfind(']')
+    else:
+        start, end = object_start, raw_response.rfind('}')
+
+    if start != -1 and end > start:
+        try:
+            return orjson.loads(raw_response[start:end + 1])
+        except orjson.JSONDecodeError:
+            pass
+    return orjson.loads(strip_markdown_code_blocks(raw_response))
 
 
 def load_prompt(supermarket: Optional[str]) -> str:
-    """Load the appropriate supermarket prompt file."""
-    prompt_name = supermarket if supermarket and supermarket in SUPERMARKETS else "generic"
+    """Load the appropriate supermarket prompt file (cached after first read)."""
+    # Normalize before the cache key so None and any invalid name share
+    # the single "generic" entry instead of each occupying a cache slot
+    return _read_prompt(supermarket if supermarket and supermarket in SUPERMARKETS else "generic")
+
+
+@lru_cache(maxsize=32)
+def _read_prompt(prompt_name: str) -> str:
     prompt_path = BASE_DIR / "prompts" / f"{prompt_name}.md"
 
     if not prompt_path.exists():
@@ -226,8 +467,17 @@ def load_prompt(supermarket: Optional[str]) -> str:
         return f.read()
 
 
-def process_items_with_llm(items_text: str, supermarket: Optional[str]) -> Tuple[List[dict], Dict[str, Any]]:
-    """Process shopping list text into categorized items using LLM."""
+@lru_cache(maxsize=16)
+def _categorize_system_message(supermarket: Optional[str]) -> Dict[str, Any]:
+    """Build the static categorization system message once per supermarket.
+
+    The store layout plus instructions dwarfs the per-request item text
+    and never varies between requests. Building it once skips the big
+    f-string per call, and the cache_control hint lets providers that
+    support prompt caching (via OpenRouter) reuse the prefix instead of
+    re-billing and re-processing those input tokens every request. Only
+    the user message changes per call, so the cache key stays stable.
+    """
     store_layout = load_prompt(supermarket)
 
     system_prompt = f"""You are a shopping list organizer. Parse the input into a structured list.
@@ -248,33 +498,128 @@ Example output:
 
 IMPORTANT: Respond ONLY with the JSON array, no additional text."""
 
-    # Build messages in OpenAI format
+    return {
+        "role": "system",
+        "content": [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+    }
+
+
+def process_items_with_llm(items_text: str, supermarket: Optional[str]) -> Tuple[List[dict], Dict[str, Any]]:
+    """Process shopping list text into categorized items using LLM."""
+    # Build messages in OpenAI format (static cached prefix + per-call text)
     messages = [
-        {"role": "system", "content": system_prompt},
+        _categorize_system_message(supermarket),
         {"role": "user", "content": items_text}
     ]
 
-    # Make request via OpenRouter API
+    # Make request via OpenRouter API. Deliberately non-streaming: the
+    # whole response is needed before validation anyway, the bulk insert
+    # in database.create_shopping_list is a single sub-millisecond
+    # statement (nothing worth overlapping with generation), and the
+    # BatchScheduler relies on one complete response per dispatched call.
     raw_response, usage_stats = openrouter_client.chat_completion(
         model=MODEL_NAME,
         messages=messages
     )
 
-    # Log for debugging
-    print(f"Model used: {MODEL_NAME}")
-    print(f"Token count - Input: {usage_stats['input_tokens']}, Output: {usage_stats['output_tokens']}, Cost: ${usage_stats['cost']:.6f}")
-    print("Raw LLM response:", raw_response)
+    log.info(
+        "Model used: %s - Input: %s, Output: %s, Cost: $%.6f",
+        MODEL_NAME, usage_stats['input_tokens'], usage_stats['output_tokens'], usage_stats['cost']
+    )
+    log.debug("Raw LLM response: %s", raw_response)
 
     # Parse response
-    cleaned_response = strip_markdown_code_blocks(raw_response)
-    return json.loads(cleaned_response), usage_stats
+    return parse_llm_json(raw_response), usage_stats
+
+
+def process_items_batch_with_llm(
+    batch_texts: List[str],
+    supermarket: Optional[str]
+) -> Tuple[List[List[dict]], Dict[str, Any]]:
+    """Categorize several independent shopping lists with one LLM call.
+
+    Used by the BatchScheduler when concurrent requests share a
+    supermarket. Returns one item list per input text, in order, plus the
+    shared usage stats for the combined call.
+    """
+    store_layout = load_prompt(supermarket)
+
+    system_prompt = f"""You are a shopping list organizer. You will receive {len(batch_texts)} separate shopping lists, each labelled LIST <n>. Parse each into a structured list.
+
+{store_layout}
+
+Respond with a JSON object whose keys are the list numbers ("1", "2", ...) and whose values are JSON arrays. Each item must have:
+- "name": Item name (cleaned up, standardized - e.g., "Semi-skimmed milk" not "milk semi skimmed")
+- "quantity": Quantity if specified (e.g., "2", "500g", "x3"), null if not specified
+- "area": Category key from the layout above (e.g., "dairy", "produce")
+- "area_order": Number from the layout order above
+
+Example output:
+{{
+    "1": [{{"name": "Semi-skimmed milk", "quantity": "2L", "area": "dairy", "area_order": 3}}],
+    "2": [{{"name": "Bananas", "quantity": "6", "area": "produce", "area_order": 1}}]
+}}
+
+Keep the lists completely separate - never move an item between lists.
+
+IMPORTANT: Respond ONLY with the JSON object, no additional text."""
+
+    user_prompt = "\n\n".join(
+        f"LIST {i}:\n{text}" for i, text in enumerate(batch_texts, start=1)
+    )
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    raw_response, usage_stats = openrouter_client.chat_completion(
+        model=MODEL_NAME,
+        messages=messages
+    )
+
+    log.info(
+        "Model used: %s (batch of %d) - Input: %s, Output: %s, Cost: $%.6f",
+        MODEL_NAME, len(batch_texts),
+        usage_stats['input_tokens'], usage_stats['output_tokens'], usage_stats['cost']
+    )
+
+    result = parse_llm_json(raw_response)
+
+    if not isinstance(result, dict):
+        raise ValueError("LLM batch response must be a JSON object")
+
+    item_lists = []
+    for i in range(1, len(batch_texts) + 1):
+        items = result.get(str(i))
+        if not isinstance(items, list):
+            raise ValueError(f"LLM batch response is missing list {i}")
+        item_lists.append(items)
+
+    return item_lists, usage_stats
+
+
+def _image_data_url(image_base64: str) -> str:
+    """Return a data URL for the image without copying the payload.
+
+    A data URL is forwarded as-is (keeping its original mime type); only
+    a bare base64 string gets a prefix added. split(',') would allocate a
+    full copy of the multi-megabyte payload plus a throwaway prefix.
+    """
+    if image_base64.startswith('data:'):
+        return image_base64
+    return f"data:image/png;base64,{image_base64}"
 
 
 def ocr_image_with_llm(image_base64: str) -> Tuple[str, Dict[str, Any]]:
     """Extract text from image using vision-capable LLM."""
-    # Handle data URL format (e.g., "data:image/png;base64,...")
-    if ',' in image_base64:
-        image_base64 = image_base64.split(',')[1]
+    image_url = _image_data_url(image_base64)
 
     prompt_text = (
         "Extract all text from this shopping list image. "
@@ -292,7 +637,7 @@ def ocr_image_with_llm(image_base64: str) -> Tuple[str, Dict[str, Any]]:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{image_base64}"
+                        "url": image_url
                     }
                 }
             ]
@@ -305,39 +650,101 @@ def ocr_image_with_llm(image_base64: str) -> Tuple[str, Dict[str, Any]]:
         messages=messages
     )
 
-    # Log for debugging
-    print(f"Vision model used: {VISION_MODEL_NAME}")
-    print(f"Token count - Input: {usage_stats['input_tokens']}, Output: {usage_stats['output_tokens']}, Cost: ${usage_stats['cost']:.6f}")
+    log.info(
+        "Vision model used: %s - Input: %s, Output: %s, Cost: $%.6f",
+        VISION_MODEL_NAME, usage_stats['input_tokens'], usage_stats['output_tokens'], usage_stats['cost']
+    )
 
     return raw_response, usage_stats
 
 
-def process_edit_with_llm(
-    existing_items: List[dict],
-    edit_text: str,
+@lru_cache(maxsize=16)
+def _combined_image_system_message(supermarket: Optional[str]) -> Dict[str, Any]:
+    """Static system message for the single-call OCR + categorization path."""
+    store_layout = load_prompt(supermarket)
+
+    system_prompt = f"""You are a shopping list organizer. Read the shopping list in the image and parse it into a structured list.
+
+{store_layout}
+
+Respond with a JSON object with two fields:
+- "raw_text": The text you read from the image, one item per line
+- "items": A JSON array where each entry must have:
+  - "name": Item name (cleaned up, standardized - e.g., "Semi-skimmed milk" not "milk semi skimmed")
+  - "quantity": Quantity if specified (e.g., "2", "500g", "x3"), null if not specified
+  - "area": Category key from the layout above (e.g., "dairy", "produce")
+  - "area_order": Number from the layout order above
+
+IMPORTANT: Respond ONLY with the JSON object, no additional text."""
+
+    return {
+        "role": "system",
+        "content": [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+    }
+
+
+def process_image_with_llm(
+    image_base64: str,
     supermarket: Optional[str]
-) -> Tuple[List[dict], Dict[str, List[str]], Dict[str, Any]]:
+) -> Tuple[str, List[dict], Dict[str, Any]]:
+    """OCR and categorize a shopping-list image with a single vision call.
+
+    Collapsing the OCR and categorization round-trips saves a full LLM
+    call of wall time and output tokens on the image path. The model also
+    reports the text it read, which is stored as raw_input so the prompt
+    analysis the two-stage path fed still gets its data.
+
+    Returns (extracted_text, items, usage_stats).
     """
-    Process edit instructions to modify an existing shopping list.
+    messages = [
+        _combined_image_system_message(supermarket),
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "Extract the shopping list from this image."},
+                {"type": "image_url", "image_url": {"url": _image_data_url(image_base64)}}
+            ]
+        }
+    ]
 
-    Args:
-        existing_items: Current items in the list
-        edit_text: Natural language edit instructions
-        supermarket: The supermarket for categorization
+    raw_response, usage_stats = openrouter_client.chat_completion(
+        model=VISION_MODEL_NAME,
+        messages=messages
+    )
 
-    Returns:
-        Tuple of (new_items, changes_dict, usage_stats)
+    log.info(
+        "Vision model used: %s (combined) - Input: %s, Output: %s, Cost: $%.6f",
+        VISION_MODEL_NAME, usage_stats['input_tokens'], usage_stats['output_tokens'], usage_stats['cost']
+    )
+    log.debug("Raw LLM combined response: %s", raw_response)
+
+    result = parse_llm_json(raw_response)
+    if not isinstance(result, dict) or not isinstance(result.get("items"), list):
+        raise ValueError("LLM combined response must be a JSON object with an 'items' array")
+
+    raw_text = result.get("raw_text")
+    extracted_text = raw_text if isinstance(raw_text, str) else ""
+    return extracted_text, result["items"], usage_stats
+
+
+@lru_cache(maxsize=16)
+def _edit_system_message(supermarket: Optional[str]) -> Dict[str, Any]:
+    """Build the (static per supermarket) edit system message.
+
+    Same shape as _categorize_system_message: the store layout and editing
+    instructions never change between calls, so cache the assembled message
+    and mark it cacheable for the provider.
     """
     store_layout = load_prompt(supermarket)
 
-    # Format existing items for the prompt
-    existing_list = "\n".join([
-        f"- {item['name']}" + (f" ({item['quantity']})" if item.get('quantity') else "")
-        for item in existing_items
-    ])
-
     system_prompt = f"""You are a shopping list editor. You will receive a current shopping list and edit instructions.
-Apply the edit instructions to modify the list.
+Respond with only the operations needed to apply the instructions — do NOT rewrite the whole list.
 
 {store_layout}
 
@@ -347,15 +754,14 @@ INSTRUCTIONS FOR EDITING:
 - "change X to Y" or "replace X with Y" means replace item X with Y
 - You can interpret natural language like "I don't need the apples anymore" as "remove apples"
 - Be smart about matching items - "remove milk" should remove "Semi-skimmed milk" if that's what's in the list
-- Keep all existing items that weren't explicitly removed or changed
+- Items not mentioned in the instructions are kept automatically; never emit operations for them
 
-Respond with a JSON object containing:
-1. "items": Array of all items in the updated list (same format as before)
-2. "added": Array of item names that were newly added
-3. "removed": Array of item names that were removed
-4. "kept": Array of item names that were kept unchanged
+Respond with a JSON object containing one key, "ops": an array of operations applied in order:
+1. {{"op": "add", "item": {{...}}}} adds a new item
+2. {{"op": "remove", "match": "<name>"}} removes an item; "match" is the item's name exactly as it appears in the CURRENT LIST
+3. {{"op": "replace", "match": "<name>", "item": {{...}}}} swaps an existing item for a new one
 
-Each item in the "items" array must have:
+Each "item" must have:
 - "name": Item name (cleaned up, standardized)
 - "quantity": Quantity if specified (e.g., "2", "500g"), null if not specified
 - "area": Category key from the layout above (e.g., "dairy", "produce")
@@ -363,17 +769,118 @@ Each item in the "items" array must have:
 
 Example response:
 {{
-    "items": [
-        {{"name": "Semi-skimmed milk", "quantity": "2L", "area": "dairy", "area_order": 3}},
-        {{"name": "Salmon fillets", "quantity": "400g", "area": "meat", "area_order": 4}}
-    ],
-    "added": ["Salmon fillets"],
-    "removed": ["Bananas"],
-    "kept": ["Semi-skimmed milk"]
+    "ops": [
+        {{"op": "add", "item": {{"name": "Salmon fillets", "quantity": "400g", "area": "meat", "area_order": 4}}}},
+        {{"op": "remove", "match": "Bananas"}}
+    ]
 }}
 
 IMPORTANT: Respond ONLY with the JSON object, no additional text."""
 
+    return {
+        "role": "system",
+        "content": [
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ],
+    }
+
+
+def _match_item_index(items: List[dict], match: str) -> Optional[int]:
+    """Resolve an edit-op "match" string to an index in items.
+
+    Tries exact name match first, then substring either way, then a fuzzy
+    difflib match, all case-insensitively — the model usually echoes the
+    name verbatim, but users say "milk" for "Semi-skimmed milk".
+    """
+    needle = match.strip().casefold()
+    if not needle:
+        return None
+    names = [item['name'].casefold() for item in items]
+    for index, name in enumerate(names):
+        if name == needle:
+            return index
+    for index, name in enumerate(names):
+        if needle in name or name in needle:
+            return index
+    close = difflib.get_close_matches(needle, names, n=1, cutoff=0.8)
+    if close:
+        return names.index(close[0])
+    return None
+
+
+def apply_edit_ops(
+    existing_items: List[dict],
+    ops: List[dict]
+) -> Tuple[List[dict], Dict[str, List[str]]]:
+    """Apply add/remove/replace operations to the existing items.
+
+    Returns the resulting item list plus the added/removed/kept name lists
+    the rest of the edit pipeline expects. Ops whose "match" resolves to
+    nothing are logged and skipped rather than failing the whole edit.
+    """
+    items = [dict(item) for item in existing_items]
+    added: List[str] = []
+    removed: List[str] = []
+
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'add':
+            item = op.get('item')
+            if isinstance(item, dict):
+                items.append(item)
+                added.append(item.get('name', ''))
+        elif kind in ('remove', 'replace'):
+            index = _match_item_index(items, op.get('match') or '')
+            if index is None:
+                log.warning("Edit op %r matched no item on the list", op.get('match'))
+                continue
+            removed.append(items.pop(index)['name'])
+            if kind == 'replace':
+                item = op.get('item')
+                if isinstance(item, dict):
+                    items.insert(index, item)
+                    added.append(item.get('name', ''))
+        else:
+            log.warning("Ignoring unknown edit op %r", kind)
+
+    removed_set = {name.casefold() for name in removed}
+    kept = [
+        item['name'] for item in existing_items
+        if item['name'].casefold() not in removed_set
+    ]
+    return items, {'added': added, 'removed': removed, 'kept': kept}
+
+
+def process_edit_with_llm(
+    existing_items: List[dict],
+    edit_text: str,
+    supermarket: Optional[str]
+) -> Tuple[List[dict], Dict[str, List[str]], Dict[str, Any]]:
+    """
+    Process edit instructions to modify an existing shopping list.
+
+    Asks the model for a structured diff (add/remove/replace ops) and
+    applies it here, so output tokens scale with the edit rather than the
+    list length and kept items retain their existing categorization.
+
+    Args:
+        existing_items: Current items in the list (with area/area_order)
+        edit_text: Natural language edit instructions
+        supermarket: The supermarket for categorization
+
+    Returns:
+        Tuple of (new_items, changes_dict, usage_stats)
+    """
+    # Format existing items for the prompt
+    existing_list = "\n".join([
+        f"- {item['name']}" + (f" ({item['quantity']})" if item.get('quantity') else "")
+        for item in existing_items
+    ])
+
     user_prompt = f"""CURRENT LIST:
 {existing_list}
 
@@ -382,7 +889,7 @@ EDIT INSTRUCTIONS:
 
     # Build messages in OpenAI format
     messages = [
-        {"role": "system", "content": system_prompt},
+        _edit_system_message(supermarket),
         {"role": "user", "content": user_prompt}
     ]
 
@@ -393,69 +900,118 @@ EDIT INSTRUCTIONS:
     )
 
     # Log for debugging
-    print(f"Edit model used: {MODEL_NAME}")
-    print(f"Token count - Input: {usage_stats['input_tokens']}, Output: {usage_stats['output_tokens']}, Cost: ${usage_stats['cost']:.6f}")
-    print("Raw LLM edit response:", raw_response)
+    log.info(
+        "Edit model used: %s - Input: %s, Output: %s, Cost: $%.6f",
+        MODEL_NAME, usage_stats['input_tokens'], usage_stats['output_tokens'], usage_stats['cost']
+    )
+    log.debug("Raw LLM edit response: %s", raw_response)
 
     # Parse and validate response
-    cleaned_response = strip_markdown_code_blocks(raw_response)
-    result = json.loads(cleaned_response)
+    result = parse_llm_json(raw_response)
 
     # Validate structure of LLM JSON response
     if not isinstance(result, dict):
         raise ValueError("LLM edit response must be a JSON object")
 
-    if "items" not in result:
-        raise ValueError("LLM edit response is missing required 'items' field")
-
-    items = result["items"]
-    if not isinstance(items, list):
-        raise ValueError("LLM edit response field 'items' must be a list")
+    ops = result.get("ops")
+    if not isinstance(ops, list):
+        raise ValueError("LLM edit response is missing required 'ops' list")
 
-    for index, item in enumerate(items):
-        if not isinstance(item, dict):
-            raise ValueError(f"LLM edit response 'items[{index}]' must be a JSON object")
+    for index, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise ValueError(f"LLM edit response 'ops[{index}]' must be a JSON object")
 
-    changes: Dict[str, List[Any]] = {}
-    for key in ("added", "removed", "kept"):
-        value = result.get(key, [])
-        if not isinstance(value, list):
-            raise ValueError(f"LLM edit response field '{key}' must be a list")
-        changes[key] = value
+    items, changes = apply_edit_ops(existing_items, ops)
     return items, changes, usage_stats
 
 
-# Serve index.html at root
+# Cache-Control values for static assets. Nothing here is content-hashed,
+# so assets get a day of freshness (ETag revalidation after that) while the
+# PWA entry points always revalidate so app updates roll out immediately.
+ASSET_CACHE_CONTROL = "public, max-age=86400"
+PWA_CACHE_CONTROL = "no-cache"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that stamps a Cache-Control header on every response.
+
+    The default StaticFiles revalidates each asset on every page load; a
+    max-age lets returning clients skip those roundtrips entirely.
+    """
+
+    def __init__(self, *args, cache_control: str = ASSET_CACHE_CONTROL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
+
+
+@lru_cache(maxsize=8)
+def _static_page(filename: str) -> Tuple[bytes, str]:
+    """Load a small static page into memory once, with its ETag.
+
+    index.html is served on every deep link and sw.js on every reload;
+    caching the bytes (they only change on deploy, which restarts the
+    process) removes the open()/stat()/read() syscalls per hit.
+    """
+    content = (BASE_DIR / filename).read_bytes()
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+    return content, etag
+
+
+def _static_page_response(
+    request: Request,
+    filename: str,
+    media_type: str,
+    cache_control: str = PWA_CACHE_CONTROL,
+) -> Response:
+    """Serve a cached static file, honouring If-None-Match revalidation."""
+    content, etag = _static_page(filename)
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+# Serve index.html at root (always revalidated: it's the PWA entry point)
 @app.get("/")
-async def read_root():
-    return FileResponse(BASE_DIR / "index.html")
+async def read_root(request: Request):
+    return _static_page_response(request, "index.html", "text/html")
 
 
-# Mount static directories
-app.mount("/dist", StaticFiles(directory=BASE_DIR / "dist"), name="dist")
-app.mount("/static", StaticFiles(directory=BASE_DIR / "static"), name="static")
+# Mount static directories. dist/ is a build artifact (npm run build:css
+# locally, the css-builder stage in Docker) and isn't tracked, so mount it
+# with check_dir=False to keep fresh clones importable before a CSS build.
+app.mount("/dist", CachedStaticFiles(directory=BASE_DIR / "dist", check_dir=False), name="dist")
+app.mount("/static", CachedStaticFiles(directory=BASE_DIR / "static"), name="static")
 
 
-# Serve static images
+# Serve static images from memory like the PWA pages, but long-cacheable:
+# they only change on deploy and ETag revalidation covers that
 @app.get("/paris-figure.jpg")
-async def paris_figure():
-    return FileResponse(BASE_DIR / "paris-figure.jpg")
+async def paris_figure(request: Request):
+    return _static_page_response(request, "paris-figure.jpg", "image/jpeg",
+                                 cache_control=ASSET_CACHE_CONTROL)
 
 
 @app.get("/paris-figure-down.jpg")
-async def paris_figure_down():
-    return FileResponse(BASE_DIR / "paris-figure-down.jpg")
+async def paris_figure_down(request: Request):
+    return _static_page_response(request, "paris-figure-down.jpg", "image/jpeg",
+                                 cache_control=ASSET_CACHE_CONTROL)
 
 
-# Serve PWA files
+# Serve PWA files (always revalidated so new service workers deploy promptly)
 @app.get("/manifest.json")
-async def manifest():
-    return FileResponse(BASE_DIR / "manifest.json")
+async def manifest(request: Request):
+    return _static_page_response(request, "manifest.json", "application/json")
 
 
 @app.get("/sw.js")
-async def service_worker():
-    return FileResponse(BASE_DIR / "sw.js", media_type="application/javascript")
+async def service_worker(request: Request):
+    return _static_page_response(request, "sw.js", "application/javascript")
 
 
 # API endpoints
@@ -467,28 +1023,26 @@ async def process_text(request: ProcessTextRequest):
         if request.supermarket and request.supermarket not in SUPERMARKETS:
             raise HTTPException(status_code=400, detail="Invalid supermarket")
 
-        # Process with LLM
-        items, planning_usage = process_items_with_llm(request.text, request.supermarket)
+        # Process with LLM (concurrent requests may share one call)
+        items, planning_usage = await llm_batcher.submit(request.text, request.supermarket)
 
         # Validate items
         if not isinstance(items, list) or len(items) == 0:
             raise HTTPException(status_code=500, detail="No items found in input")
 
-        for item in items:
-            if not all(k in item for k in ("name", "area", "area_order")):
-                raise HTTPException(status_code=500, detail="Invalid item format from LLM")
+        validate_llm_items(items)
 
-        # Save to database
-        list_id = database.create_shopping_list(
+        # Save to database (off the event loop: writes can wait on the
+        # busy_timeout when another writer holds the lock). The insert
+        # returns the full list shape, so no follow-up read is needed.
+        list_data = await asyncio.to_thread(
+            database.create_shopping_list_data,
             items,
             request.supermarket,
             raw_input=request.text,
             input_type="text"
         )
 
-        # Get the formatted response
-        list_data = database.get_shopping_list(list_id)
-
         response = format_list_response(list_data)
         response.meta = {
             "planning": planning_usage
@@ -497,78 +1051,146 @@ async def process_text(request: ProcessTextRequest):
 
     except HTTPException:
         raise
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse LLM response: {str(e)}")
     except Exception as e:
-        print(f"Error processing text: {str(e)}")
+        log.exception("Error processing text")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
-@app.post("/api/process-image", response_model=ShoppingListResponse)
-async def process_image(request: ProcessImageRequest):
-    """Process image input (OCR + categorization) into a shopping list."""
+async def _process_image_to_list(image_base64: str, supermarket: Optional[str]) -> ShoppingListResponse:
+    """OCR an image and turn the extracted text into a categorized list.
+
+    Shared by the base64-JSON and multipart upload endpoints.
+    """
     try:
         # Validate supermarket if provided
-        if request.supermarket and request.supermarket not in SUPERMARKETS:
+        if supermarket and supermarket not in SUPERMARKETS:
             raise HTTPException(status_code=400, detail="Invalid supermarket")
 
-        # OCR the image
-        print("Starting OCR...")
-        extracted_text, ocr_usage = ocr_image_with_llm(request.image)
-        print(f"OCR result: {extracted_text}")
-
-        if not extracted_text.strip():
-            raise HTTPException(status_code=400, detail="Could not extract any text from image")
-
-        # Process the extracted text
-        items, planning_usage = process_items_with_llm(extracted_text, request.supermarket)
+        if IMAGE_TWO_STAGE:
+            # Debug path: OCR the image off the event loop, warming the
+            # store-layout prompt concurrently, then categorize the text
+            # (concurrent requests may share one call).
+            log.debug("Starting OCR...")
+            (extracted_text, ocr_usage), _ = await asyncio.gather(
+                asyncio.to_thread(ocr_image_with_llm, image_base64),
+                asyncio.to_thread(load_prompt, supermarket),
+            )
+            log.debug("OCR result: %s", extracted_text)
+
+            if not extracted_text.strip():
+                raise HTTPException(status_code=400, detail="Could not extract any text from image")
+
+            items, planning_usage = await llm_batcher.submit(extracted_text, supermarket)
+            meta = {"ocr": ocr_usage, "planning": planning_usage}
+        else:
+            # One vision call does OCR and categorization together
+            extracted_text, items, combined_usage = await asyncio.to_thread(
+                process_image_with_llm, image_base64, supermarket
+            )
+            meta = {"combined": combined_usage}
 
         # Validate items
         if not isinstance(items, list) or len(items) == 0:
             raise HTTPException(status_code=500, detail="No items found in image")
 
-        for item in items:
-            if not all(k in item for k in ("name", "area", "area_order")):
-                raise HTTPException(status_code=500, detail="Invalid item format from LLM")
+        validate_llm_items(items)
 
-        # Save to database
-        list_id = database.create_shopping_list(
+        # Save to database (off the event loop, as in process_text); the
+        # insert returns the full list shape, so no follow-up read
+        list_data = await asyncio.to_thread(
+            database.create_shopping_list_data,
             items,
-            request.supermarket,
+            supermarket,
             raw_input=extracted_text,
             input_type="image"
         )
 
-        # Get the formatted response
-        list_data = database.get_shopping_list(list_id)
-
         response = format_list_response(list_data)
-        response.meta = {
-            "ocr": ocr_usage,
-            "planning": planning_usage
-        }
+        response.meta = meta
         return response
 
     except HTTPException:
         raise
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse LLM response: {str(e)}")
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        log.exception("Error processing image")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+@app.post("/api/process-image", response_model=ShoppingListResponse)
+async def process_image(request: Request):
+    """Process base64 image input (OCR + categorization) into a shopping list.
+
+    Reads the JSON body directly rather than through a Pydantic model: the
+    base64 payload can be megabytes, and model validation would copy and
+    UTF-8-scan the whole string again on the event loop. Prefer the
+    multipart /api/process-image-bytes endpoint for new clients.
+    """
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    image = payload.get("image") if isinstance(payload, dict) else None
+    if not isinstance(image, str) or not image:
+        raise HTTPException(status_code=422, detail="Missing image field")
+
+    return await _process_image_to_list(image, payload.get("supermarket"))
+
+
+@app.post("/api/process-image-bytes", response_model=ShoppingListResponse)
+async def process_image_bytes(
+    file: UploadFile = File(...),
+    supermarket: Optional[str] = Form(None),
+):
+    """Process a raw image upload (OCR + categorization) into a shopping list.
+
+    Accepts the image as multipart bytes, avoiding the ~33% base64 transport
+    overhead and the JSON string copy of the base64 endpoint.
+    """
+    image_bytes = await file.read()
+    if not image_bytes:
+        raise HTTPException(status_code=422, detail="Empty image upload")
+
+    # The vision API wants a base64 data URL, so encode once here (SIMD via
+    # pybase64), rather than shipping base64 over the wire and through JSON
+    # parsing.
+    image_base64 = pybase64.b64encode(image_bytes).decode('ascii')
+    return await _process_image_to_list(image_base64, supermarket)
+
+
 @app.get("/api/list/{list_id}", response_model=ShoppingListResponse)
-async def get_list(list_id: str):
+async def get_list(request: Request, list_id: str):
     """Get a shopping list by ID."""
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=400, detail="Invalid list ID format")
 
-    list_data = database.get_shopping_list(list_id)
+    if_none_match = request.headers.get("if-none-match")
+
+    cached = _list_cache.get(list_id)
+    if cached is not None:
+        etag = f'"{cached[0]}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=cached[1], media_type="application/json",
+                        headers={"ETag": etag})
+
+    list_data = await asyncio.to_thread(database.get_shopping_list, list_id)
     if list_data is None:
         raise HTTPException(status_code=404, detail="Shopping list not found")
 
-    return format_list_response(list_data)
+    revision = list_data.get('revision', 0)
+    etag = f'"{revision}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = orjson.dumps(format_list_response(list_data).model_dump())
+    _store_list_cache(list_id, revision, body)
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag})
 
 
 @app.put("/api/list/{list_id}/item/{item_id}", response_model=ItemUpdateResponse)
@@ -577,10 +1199,14 @@ async def update_item(list_id: str, item_id: int, request: UpdateItemRequest):
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=400, detail="Invalid list ID format")
 
-    revision = database.update_item_status(list_id, item_id, request.checked)
+    # Writes can block on busy_timeout under contention; keep them off the loop
+    revision = await asyncio.to_thread(
+        database.update_item_status, list_id, item_id, request.checked
+    )
     if revision is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
+    _invalidate_list_cache(list_id, revision)
     list_event_broker.publish(list_id, {
         "type": "item.updated",
         "revision": revision,
@@ -591,17 +1217,30 @@ async def update_item(list_id: str, item_id: int, request: UpdateItemRequest):
 
 
 @app.get("/api/list/{list_id}/version", response_model=ListVersionResponse)
-async def get_list_version(list_id: str):
-    """Get the current timestamp and monotonic revision of a list."""
+async def get_list_version(request: Request, list_id: str):
+    """Get the current timestamp and monotonic revision of a list.
+
+    Sends an ETag derived from the revision so polling clients can
+    revalidate with If-None-Match and get an empty 304 while unchanged.
+    """
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=400, detail="Invalid list ID format")
 
-    updated_at = database.get_list_version(list_id)
-    revision = database.get_list_revision(list_id)
+    updated_at, revision = await asyncio.gather(
+        asyncio.to_thread(database.get_list_version, list_id),
+        asyncio.to_thread(database.get_list_revision, list_id),
+    )
     if updated_at is None or revision is None:
         raise HTTPException(status_code=404, detail="List not found")
 
-    return ListVersionResponse(updated_at=updated_at, revision=revision)
+    etag = f'"{revision}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return ORJSONResponse(
+        ListVersionResponse(updated_at=updated_at, revision=revision).model_dump(),
+        headers={"ETag": etag},
+    )
 
 
 @app.get("/api/list/{list_id}/events")
@@ -610,7 +1249,7 @@ async def stream_list_events(list_id: str):
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=400, detail="Invalid list ID format")
 
-    if database.get_list_revision(list_id) is None:
+    if await asyncio.to_thread(database.get_list_revision, list_id) is None:
         raise HTTPException(status_code=404, detail="List not found")
 
     async def event_stream():
@@ -618,7 +1257,7 @@ async def stream_list_events(list_id: str):
         try:
             # Subscribe before reading the revision so an update cannot fall
             # into the gap between the initial snapshot and the live stream.
-            revision = database.get_list_revision(list_id)
+            revision = await asyncio.to_thread(database.get_list_revision, list_id)
             if revision is None:
                 return
             yield format_sse_event({"type": "connected", "revision": revision})
@@ -652,21 +1291,25 @@ async def edit_list(list_id: str, request: EditListRequest):
 
     try:
         # Get the existing list
-        list_data = database.get_shopping_list(list_id)
+        list_data = await asyncio.to_thread(database.get_shopping_list, list_id)
         if list_data is None:
             raise HTTPException(status_code=404, detail="List not found")
 
-        # Flatten existing items from groups
+        # Flatten existing items from groups, keeping their categorization
+        # so unchanged items don't need re-categorizing by the model
         existing_items = []
         for group in list_data['groups']:
             for item in group['items']:
                 existing_items.append({
                     'name': item['name'],
-                    'quantity': item.get('quantity')
+                    'quantity': item.get('quantity'),
+                    'area': group['area'],
+                    'area_order': group['area_order']
                 })
 
-        # Process edit instructions with LLM
-        new_items, changes, edit_usage = process_edit_with_llm(
+        # Process edit instructions with LLM, off the event loop
+        new_items, changes, edit_usage = await asyncio.to_thread(
+            process_edit_with_llm,
             existing_items,
             request.text,
             list_data['supermarket']
@@ -676,33 +1319,28 @@ async def edit_list(list_id: str, request: EditListRequest):
         if not isinstance(new_items, list):
             raise HTTPException(status_code=500, detail="Invalid response from LLM")
 
-        for item in new_items:
-            if not all(k in item for k in ("name", "area", "area_order")):
-                raise HTTPException(status_code=500, detail="Invalid item format from LLM")
+        validate_llm_items(new_items)
 
         # Update the database
-        revision = database.update_shopping_list(list_id, new_items, changes)
+        revision = await asyncio.to_thread(
+            database.update_shopping_list, list_id, new_items, changes
+        )
         if revision is None:
             raise HTTPException(status_code=500, detail="Failed to update list")
 
+        _invalidate_list_cache(list_id, revision)
+
         # Get the updated list
-        updated_list = database.get_shopping_list(list_id)
+        updated_list = await asyncio.to_thread(database.get_shopping_list, list_id)
 
         # Format response
-        groups = []
-        for group in updated_list['groups']:
-            area_display = AREA_DISPLAY_NAMES.get(group['area'], group['area'].title())
-            groups.append(ItemGroup(
-                area=group['area'],
-                area_display=area_display,
-                items=[ShoppingItem(**item) for item in group['items']]
-            ))
+        groups = build_item_groups(updated_list['groups'])
 
         supermarket_display = None
         if updated_list['supermarket']:
             supermarket_display = SUPERMARKETS.get(updated_list['supermarket'])
 
-        response = EditListResponse(
+        response = EditListResponse.model_construct(
             list_id=list_id,
             supermarket=updated_list['supermarket'],
             supermarket_display=supermarket_display,
@@ -720,193 +1358,179 @@ async def edit_list(list_id: str, request: EditListRequest):
 
     except HTTPException:
         raise
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse LLM response: {str(e)}")
     except Exception as e:
-        print(f"Error editing list: {str(e)}")
+        log.exception("Error editing list")
         raise HTTPException(status_code=500, detail=f"Error editing list: {str(e)}")
 
 
+# Rendered PDFs keyed by (list_id, revision). updated_at is only second-
+# granular, so two writes in the same second would collide; the revision
+# counter bumps on every write, so a new key is guaranteed per change.
+_PDF_CACHE_MAX = 128
+_pdf_cache: Dict[Tuple[str, int], bytes] = {}
+
+
+# Deliberately sync def: Starlette runs it in the threadpool, keeping the
+# PDF render off the event loop without explicit to_thread plumbing.
 @app.get("/{list_id}.pdf")
 def get_list_pdf(request: Request, list_id: str):
     """Generate and return a PDF for the shopping list."""
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=400, detail="Invalid list ID format")
 
-    list_data = database.get_shopping_list(list_id)
-    if list_data is None:
+    revision = database.get_list_revision(list_id)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Shopping list not found")
 
-    # Generate HTML for PDF
-    base_url = str(request.base_url).rstrip('/')
-    html_content = generate_pdf_html(list_data, base_url)
+    etag = f'"{revision}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename={list_id}.pdf",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache_key = (list_id, revision)
+    pdf_bytes = _pdf_cache.get(cache_key)
+    if pdf_bytes is None:
+        list_data = database.get_shopping_list(list_id)
+        if list_data is None:
+            raise HTTPException(status_code=404, detail="Shopping list not found")
+
+        base_url = str(request.base_url).rstrip('/')
+        pdf_bytes = generate_pdf_bytes(list_data, base_url)
 
-    # Generate PDF
-    pdf_bytes = HTML(string=html_content).write_pdf()
+        if len(_pdf_cache) >= _PDF_CACHE_MAX:
+            _pdf_cache.clear()
+        _pdf_cache[cache_key] = pdf_bytes
 
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={list_id}.pdf"}
+        headers=headers
     )
 
 
-def generate_pdf_html(list_data: dict, base_url: str) -> str:
-    """Generate HTML for the PDF shopping list."""
-    groups = []
-    for group in list_data['groups']:
-        area_display = AREA_DISPLAY_NAMES.get(group['area'], group['area'].title())
-        groups.append({
-            "area_display": area_display,
-            "items": group['items']
-        })
+def _pdf_text(text: str) -> str:
+    """Coerce text to latin-1 for the PDF core fonts."""
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+class _ListPDF(FPDF):
+    """A4 shopping-list layout mirroring the old WeasyPrint stylesheet."""
+
+    def __init__(self, list_url: str):
+        super().__init__(format="A4")
+        self.list_url = list_url
+        self.set_margins(20, 20)
+        self.set_auto_page_break(True, margin=25)
 
+    def footer(self):
+        self.set_y(-20)
+        self.set_draw_color(238, 238, 238)
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.set_y(-15)
+        self.set_font("helvetica", size=9)
+        self.set_text_color(153, 153, 153)
+        self.cell(0, 5, f"List: {self.list_url}", align="C")
+
+
+def generate_pdf_bytes(list_data: dict, base_url: str) -> bytes:
+    """Build the shopping-list PDF directly, without an HTML/CSS pass."""
     supermarket_display = SUPERMARKETS.get(list_data['supermarket']) if list_data['supermarket'] else "Shopping List"
 
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>Shopping List</title>
-        <style>
-            @page {{
-                size: A4;
-                margin: 2cm;
-            }}
-            body {{
-                font-family: sans-serif;
-                font-size: 12pt;
-                color: #333;
-                line-height: 1.5;
-            }}
-            h1 {{
-                font-size: 18pt;
-                margin-bottom: 0.5cm;
-                color: #000;
-                border-bottom: 2px solid #000;
-                padding-bottom: 0.2cm;
-            }}
-            .group {{
-                margin-bottom: 1cm;
-                page-break-inside: avoid;
-            }}
-            .group-header {{
-                font-weight: bold;
-                font-size: 14pt;
-                margin-bottom: 0.3cm;
-                color: #444;
-                text-transform: uppercase;
-                border-bottom: 1px solid #ccc;
-            }}
-            .item {{
-                display: flex;
-                align-items: center;
-                margin-bottom: 0.2cm;
-            }}
-            .checkbox {{
-                display: inline-block;
-                width: 12px;
-                height: 12px;
-                border: 1px solid #000;
-                margin-right: 10px;
-            }}
-            .checkbox.checked {{
-                background-color: #ddd;
-                position: relative;
-            }}
-            .checkbox.checked::after {{
-                content: '';
-                position: absolute;
-                left: 3px;
-                top: 3px;
-                width: 6px;
-                height: 6px;
-                background-color: #000;
-            }}
-            .item-text {{
-                flex: 1;
-            }}
-            .item-text.checked {{
-                text-decoration: line-through;
-                color: #888;
-            }}
-            .quantity {{
-                color: #666;
-                font-size: 0.9em;
-                margin-left: 5px;
-            }}
-            .footer {{
-                position: fixed;
-                bottom: 0;
-                left: 0;
-                right: 0;
-                text-align: center;
-                font-size: 9pt;
-                color: #999;
-                border-top: 1px solid #eee;
-                padding-top: 0.5cm;
-            }}
-        </style>
-    </head>
-    <body>
-        <h1>{supermarket_display}</h1>
-    """
+    pdf = _ListPDF(f"{base_url}/{list_data['list_id']}")
+    pdf.add_page()
+    content_width = pdf.w - pdf.l_margin - pdf.r_margin
+
+    # Title with a heavy rule beneath it
+    pdf.set_font("helvetica", "B", 18)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 9, _pdf_text(supermarket_display), new_x="LMARGIN", new_y="NEXT")
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.6)
+    pdf.line(pdf.l_margin, pdf.get_y() + 1, pdf.l_margin + content_width, pdf.get_y() + 1)
+    pdf.ln(7)
 
-    for group in groups:
+    for group in list_data['groups']:
         if not group['items']:
             continue
 
-        html += f"""
-        <div class="group">
-            <div class="group-header">{group['area_display']}</div>
-        """
+        # Keep a group header off the very bottom of the page
+        if pdf.get_y() > pdf.h - 45:
+            pdf.add_page()
+
+        area = group['area']
+        area_display = AREA_DISPLAY_NAMES.get(area) or area.title()
+        pdf.set_font("helvetica", "B", 14)
+        pdf.set_text_color(68, 68, 68)
+        pdf.cell(0, 7, _pdf_text(area_display.upper()), new_x="LMARGIN", new_y="NEXT")
+        pdf.set_draw_color(204, 204, 204)
+        pdf.set_line_width(0.2)
+        pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + content_width, pdf.get_y())
+        pdf.ln(2)
 
         for item in group['items']:
-            checked_class = " checked" if item['checked'] else ""
-            quantity_html = f'<span class="quantity">({item["quantity"]})</span>' if item.get('quantity') else ''
-
-            html += f"""
-            <div class="item">
-                <div class="checkbox{checked_class}"></div>
-                <div class="item-text{checked_class}">
-                    {item['name']}{quantity_html}
-                </div>
-            </div>
-            """
-
-        html += "</div>"
-
-    # Add footer with URL
-    list_url = f"{base_url}/{list_data['list_id']}"
-
-    html += f"""
-        <div class="footer">
-            List: {list_url}
-        </div>
-    </body>
-    </html>
+            checked = item['checked']
+            text = item['name']
+            if item.get('quantity'):
+                text += f" ({item['quantity']})"
+
+            y = pdf.get_y()
+            pdf.set_draw_color(0, 0, 0)
+            pdf.set_line_width(0.3)
+            if checked:
+                pdf.set_fill_color(221, 221, 221)
+                pdf.rect(pdf.l_margin, y + 1, 4, 4, style="DF")
+                pdf.set_font("helvetica", "S", 12)
+                pdf.set_text_color(136, 136, 136)
+            else:
+                pdf.rect(pdf.l_margin, y + 1, 4, 4)
+                pdf.set_font("helvetica", size=12)
+                pdf.set_text_color(51, 51, 51)
+            pdf.set_x(pdf.l_margin + 7)
+            pdf.cell(0, 6, _pdf_text(text), new_x="LMARGIN", new_y="NEXT")
+            pdf.ln(1)
+
+        pdf.ln(8)
+
+    return bytes(pdf.output())
+
+
+def build_item_groups(groups_data: List[dict]) -> List[ItemGroup]:
+    """Build ItemGroup models from grouped database rows.
+
+    Uses model_construct throughout: the rows come straight from our own
+    schema, so re-running Pydantic validation per item on every read
+    would only burn CPU re-checking types the database already enforces.
     """
+    # Bind the lookups once; .title() only runs for areas the LLM invented
+    area_get = AREA_DISPLAY_NAMES.get
+    item_construct = ShoppingItem.model_construct
+    group_construct = ItemGroup.model_construct
 
-    return html
+    groups = []
+    for group in groups_data:
+        area = group['area']
+        groups.append(group_construct(
+            area=area,
+            area_display=area_get(area) or area.title(),
+            items=[item_construct(**item) for item in group['items']]
+        ))
+    return groups
 
 
 def format_list_response(list_data: dict) -> ShoppingListResponse:
     """Format database response into API response model."""
-    groups = []
-    for group in list_data['groups']:
-        area_display = AREA_DISPLAY_NAMES.get(group['area'], group['area'].title())
-        groups.append(ItemGroup(
-            area=group['area'],
-            area_display=area_display,
-            items=[ShoppingItem(**item) for item in group['items']]
-        ))
+    groups = build_item_groups(list_data['groups'])
 
     supermarket_display = None
     if list_data['supermarket']:
         supermarket_display = SUPERMARKETS.get(list_data['supermarket'])
 
-    return ShoppingListResponse(
+    return ShoppingListResponse.model_construct(
         list_id=list_data['list_id'],
         supermarket=list_data['supermarket'],
         supermarket_display=supermarket_display,
@@ -919,13 +1543,15 @@ def format_list_response(list_data: dict) -> ShoppingListResponse:
 
 # Catch-all route for short list URLs (must be last to avoid catching other routes)
 @app.get("/{list_id}")
-async def list_page(list_id: str):
+async def list_page(request: Request, list_id: str):
     """Serve index.html for valid 5-char list slugs."""
     if not is_valid_slug(list_id):
         raise HTTPException(status_code=404, detail="Not found")
-    return FileResponse(BASE_DIR / "index.html")
+    return _static_page_response(request, "index.html", "text/html")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Single worker on purpose: the list/PDF caches and the SSE event broker
+    # are in-process, and invalidation doesn't cross worker boundaries.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
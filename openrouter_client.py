@@ -4,9 +4,85 @@ OpenRouter API Client
 Wrapper around OpenRouter API (OpenAI-compatible) for chat completion and cost tracking.
 """
 
+import logging
+
 import httpx
+import orjson
 from typing import Dict, Any, List, Optional, Tuple
 
+log = logging.getLogger(__name__)
+
+# Static headers shared by the sync and async clients
+DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://shoppr.local",
+    "X-Title": "Shoppr",
+}
+
+# Connection reuse settings shared by the sync and async clients
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+
+
+def _build_request_data(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+) -> Dict[str, Any]:
+    """Build the chat completion request payload."""
+    request_data: Dict[str, Any] = {"model": model, "messages": messages}
+    if temperature is not None:
+        request_data["temperature"] = temperature
+    if max_tokens is not None:
+        request_data["max_tokens"] = max_tokens
+    return request_data
+
+
+def _parse_response(response: httpx.Response, model: str) -> Tuple[str, Dict[str, Any]]:
+    """Extract the response text and usage stats from a completion response.
+
+    Raises:
+        ValueError: If response format is invalid
+    """
+    # orjson is markedly faster than stdlib json on the string-heavy
+    # payloads LLM responses tend to be.
+    response_json = orjson.loads(response.content)
+
+    try:
+        response_text = response_json["choices"][0]["message"]["content"]
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"Invalid response format: {e}") from e
+
+    usage = response_json.get("usage", {})
+
+    # Extract cost from usage object or fallback headers. Warnings use the
+    # logger's deferred %-formatting so the happy path never formats or
+    # flushes anything.
+    cost = 0.0
+    if "cost" in usage and usage["cost"] is not None:
+        try:
+            cost = float(usage["cost"])
+        except (ValueError, TypeError):
+            log.warning("Unparseable cost in usage object for %s: %r", model, usage["cost"])
+    else:
+        cost_header = response.headers.get("x-litellm-response-cost") or response.headers.get("openrouter-cost")
+        if cost_header:
+            try:
+                cost = float(cost_header)
+            except (ValueError, TypeError):
+                log.warning("Unparseable cost header for %s: %r", model, cost_header)
+        else:
+            log.warning("No cost reported for %s; recording 0.0", model)
+
+    usage_stats = {
+        "model": model,
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "cost": cost,
+    }
+
+    return response_text, usage_stats
+
 
 class OpenRouterClient:
     """
@@ -30,9 +106,28 @@ class OpenRouterClient:
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
         self.model_prefix = model_prefix
+        # Resolved model names (prefix applied), filled on first use
+        self._model_names: Dict[str, str] = {}
+
+        # Preconfigured httpx client: static headers are serialized once,
+        # HTTP/2 + keepalive connections skip TLS handshakes on repeat calls.
+        self.httpx_client = httpx.Client(
+            base_url=self.base_url,
+            timeout=60.0,
+            http2=True,
+            headers={"Authorization": f"Bearer {self.api_key}", **DEFAULT_HEADERS},
+            limits=CLIENT_LIMITS,
+        )
 
-        # httpx client for making requests
-        self.httpx_client = httpx.Client(timeout=60.0)
+    def _full_model_name(self, model: str) -> str:
+        """Resolve the prefixed model name once per model, then reuse it."""
+        full_model_name = self._model_names.get(model)
+        if full_model_name is None:
+            full_model_name = model
+            if self.model_prefix and not model.startswith(self.model_prefix):
+                full_model_name = f"{self.model_prefix}{model}"
+            self._model_names[model] = full_model_name
+        return full_model_name
 
     def chat_completion(
         self,
@@ -62,66 +157,18 @@ class OpenRouterClient:
             httpx.HTTPError: If request fails
             ValueError: If response format is invalid
         """
-        # Add model prefix if provided and not already present
-        full_model_name = model
-        if self.model_prefix and not model.startswith(self.model_prefix):
-            full_model_name = f"{self.model_prefix}{model}"
-
-        # Build request payload
-        request_data: Dict[str, Any] = {"model": full_model_name, "messages": messages}
-        if temperature is not None:
-            request_data["temperature"] = temperature
-        if max_tokens is not None:
-            request_data["max_tokens"] = max_tokens
-
-        # Make request via httpx
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://shoppr.local",
-            "X-Title": "Shoppr",
-        }
+        request_data = _build_request_data(
+            self._full_model_name(model), messages, temperature, max_tokens
+        )
+
+        # Make request via httpx (auth and static headers are set on the client)
         response = self.httpx_client.post(
-            f"{self.base_url}/chat/completions",
-            headers=headers,
+            "/chat/completions",
             json=request_data,
         )
         response.raise_for_status()
 
-        # Parse response body
-        response_json = response.json()
-
-        # Extract response text
-        try:
-            response_text = response_json["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as e:
-            raise ValueError(f"Invalid response format: {e}") from e
-
-        usage = response_json.get("usage", {})
-
-        # Extract cost from usage object or fallback headers
-        cost = 0.0
-        if "cost" in usage and usage["cost"] is not None:
-            try:
-                cost = float(usage["cost"])
-            except (ValueError, TypeError):
-                pass
-        else:
-            cost_header = response.headers.get("x-litellm-response-cost") or response.headers.get("openrouter-cost")
-            if cost_header:
-                try:
-                    cost = float(cost_header)
-                except (ValueError, TypeError):
-                    pass
-
-        usage_stats = {
-            "model": model,
-            "input_tokens": usage.get("prompt_tokens", 0),
-            "output_tokens": usage.get("completion_tokens", 0),
-            "cost": cost,
-        }
-
-        return response_text, usage_stats
+        return _parse_response(response, model)
 
     def close(self):
         """Close underlying HTTP client."""
@@ -134,3 +181,86 @@ class OpenRouterClient:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit."""
         self.close()
+
+
+class AsyncOpenRouterClient:
+    """
+    Async variant of OpenRouterClient built on httpx.AsyncClient.
+
+    Lets the web layer await LLM calls (and gather several concurrently)
+    instead of blocking a worker thread for the full request.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "https://openrouter.ai/api/v1",
+        api_key: str = "",
+        model_prefix: str = ""
+    ):
+        """
+        Initialize client.
+
+        Args:
+            base_url: OpenRouter API base URL (default: https://openrouter.ai/api/v1)
+            api_key: API key for authentication
+            model_prefix: Optional prefix to add to model names (e.g., "google/")
+        """
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.model_prefix = model_prefix
+        # Resolved model names (prefix applied), filled on first use
+        self._model_names: Dict[str, str] = {}
+
+        self.httpx_client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=60.0,
+            http2=True,
+            headers={"Authorization": f"Bearer {self.api_key}", **DEFAULT_HEADERS},
+            limits=CLIENT_LIMITS,
+        )
+
+    def _full_model_name(self, model: str) -> str:
+        """Resolve the prefixed model name once per model, then reuse it."""
+        full_model_name = self._model_names.get(model)
+        if full_model_name is None:
+            full_model_name = model
+            if self.model_prefix and not model.startswith(self.model_prefix):
+                full_model_name = f"{self.model_prefix}{model}"
+            self._model_names[model] = full_model_name
+        return full_model_name
+
+    async def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Make a chat completion request with cost tracking.
+
+        Same contract as OpenRouterClient.chat_completion, but awaitable.
+        """
+        request_data = _build_request_data(
+            self._full_model_name(model), messages, temperature, max_tokens
+        )
+
+        response = await self.httpx_client.post(
+            "/chat/completions",
+            json=request_data,
+        )
+        response.raise_for_status()
+
+        return _parse_response(response, model)
+
+    async def close(self):
+        """Close underlying HTTP client."""
+        await self.httpx_client.aclose()
+
+    async def __aenter__(self):
+        """Context manager entry."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        await self.close()
@@ -4,84 +4,202 @@ Advanced tests for Shoppr application.
 Covers PDF generation, error handling, and edge cases.
 """
 
+import asyncio
 import json
-import os
 import sqlite3
-import tempfile
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch
 
 import pytest
-from fastapi.testclient import TestClient
 
 import database
 import main
-from main import ListEventBroker, app, format_sse_event, strip_markdown_code_blocks
+from conftest import find_item
+from main import ListEventBroker, format_sse_event, strip_markdown_code_blocks
 
 
-@pytest.fixture
-def temp_db():
-    """Create a temporary database for testing."""
-    temp_fd, temp_path = tempfile.mkstemp(suffix=".db")
-    os.close(temp_fd)
+# Shared fixtures (temp_db, client, mock data) live in conftest.py
 
-    # Set the database path
-    original_db_path = database.DB_PATH
-    database.DB_PATH = temp_path
-    database.init_db()
 
-    yield temp_path
+# --- Utility Function Tests ---
 
-    # Cleanup
-    database.DB_PATH = original_db_path
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
+@pytest.mark.parametrize("text,expected", [
+    # Standard json block
+    ("```json\n{\"foo\": \"bar\"}\n```", '{"foo": "bar"}'),
+    # Generic code block
+    ("```\nItem 1\nItem 2\n```", "Item 1\nItem 2"),
+    # No markdown: passed through
+    ("Just some text", "Just some text"),
+    # Surrounding text: the MULTILINE-anchored patterns strip only the
+    # fence markers, keeping the content inside
+    ("Here is valid json:\n```json\n[]\n```", "Here is valid json:\n[]"),
+])
+def test_strip_markdown_code_blocks(text, expected):
+    """Test the markdown stripping utility."""
+    assert strip_markdown_code_blocks(text) == expected
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+def test_list_cache_rejects_stale_store():
+    """A mutation during a cache-miss read must win over the older body."""
+    list_id = "abc12"
+    main._list_cache.pop(list_id, None)
+    main._list_stale_floor.pop(list_id, None)
 
+    # Simulate: GET reads revision 1, then a mutation bumps to revision 2
+    # before the GET gets to store its body.
+    main._invalidate_list_cache(list_id, revision=2)
+    main._store_list_cache(list_id, revision=1, body=b'{"stale": true}')
+    assert list_id not in main._list_cache
 
-@pytest.fixture
-def mock_list_data():
-    """Mock shopping list data."""
-    return [
-        {
-            "name": "Test Item",
-            "quantity": "1",
-            "area": "produce",
-            "area_order": 1
-        }
-    ]
+    # The next read at the new revision populates the cache and clears
+    # the floor; an even older late store can no longer clobber it.
+    main._store_list_cache(list_id, revision=2, body=b'{"fresh": true}')
+    assert main._list_cache[list_id] == (2, b'{"fresh": true}')
+    assert list_id not in main._list_stale_floor
+    main._store_list_cache(list_id, revision=1, body=b'{"stale": true}')
+    assert main._list_cache[list_id] == (2, b'{"fresh": true}')
 
+    main._list_cache.pop(list_id, None)
 
-# --- Utility Function Tests ---
 
-def test_strip_markdown_code_blocks():
-    """Test the markdown stripping utility."""
-    # Test standard json block
-    text = "```json\n{\"foo\": \"bar\"}\n```"
-    assert strip_markdown_code_blocks(text) == '{"foo": "bar"}'
-
-    # Test generic code block
-    text = "```\nItem 1\nItem 2\n```"
-    assert strip_markdown_code_blocks(text) == "Item 1\nItem 2"
-
-    # Test no markdown
-    text = "Just some text"
-    assert strip_markdown_code_blocks(text) == "Just some text"
-
-    # Test surrounding text (should keep it? Logic implies it strips the blocks)
-    # The current regex `re.sub(r"^```(?:json)?\s*\n?", "", text, flags=re.MULTILINE)`
-    # removes the opening tag, and `re.sub(r"\n?```\s*$", "", text, flags=re.MULTILINE)`
-    # removes the closing tag. It keeps the content inside.
-    text = "Here is valid json:\n```json\n[]\n```"
-    # Note: the regex is anchored with ^ and $ but MULTILINE.
-    # Let's verify exact behavior.
-    # If the regex wraps entire lines or just the markers.
-    # ^``` matches start of line ` ``` `.
-    assert "[]" in strip_markdown_code_blocks(text)
+def test_list_cache_invalidated_by_item_update(client, temp_db, mock_list_data):
+    """A cached list body must not be served after an item update."""
+    list_id = database.create_shopping_list(mock_list_data, "tesco")
+
+    first = client.get(f"/api/list/{list_id}")
+    item_id = first.json()['groups'][0]['items'][0]['id']
+
+    response = client.put(f"/api/list/{list_id}/item/{item_id}", json={"checked": True})
+    assert response.status_code == 200
+
+    refreshed = client.get(f"/api/list/{list_id}").json()
+    assert find_item(refreshed, item_id)['checked'] is True
+
+
+def test_list_cache_invalidated_by_edit(client, temp_db, mock_list_data, mock_llm_usage):
+    """A cached list body must not be served after a natural-language edit."""
+    list_id = database.create_shopping_list(mock_list_data, "tesco")
+    client.get(f"/api/list/{list_id}")  # populate the cache
+
+    new_items = [{"name": "Oat milk", "quantity": None, "area": "dairy", "area_order": 3}]
+    changes = {"added": ["Oat milk"], "removed": ["Test Item"], "kept": []}
+    with patch('main.process_edit_with_llm', return_value=(new_items, changes, mock_llm_usage)):
+        response = client.post(f"/api/list/{list_id}/edit", json={"text": "swap to oat milk"})
+    assert response.status_code == 200
+
+    refreshed = client.get(f"/api/list/{list_id}").json()
+    names = [item['name'] for group in refreshed['groups'] for item in group['items']]
+    assert names == ["Oat milk"]
+
+
+# --- Static Page Revalidation Tests ---
+
+@pytest.mark.parametrize("path", ["/", "/sw.js"])
+def test_static_pages_support_revalidation(client, path):
+    """PWA entry pages answer If-None-Match with an empty 304."""
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    revalidated = client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+# --- Batch Scheduler Tests ---
+
+def test_process_items_batch_with_llm_parses_numbered_lists():
+    """Batch responses keyed "1".."N" come back as one item list per text."""
+    response = json.dumps({
+        "1": [{"name": "Milk", "quantity": None, "area": "dairy", "area_order": 3}],
+        "2": [{"name": "Bananas", "quantity": "6", "area": "produce", "area_order": 1}],
+    })
+    usage = {"model": "test", "input_tokens": 1, "output_tokens": 1, "cost": 0.0}
+
+    with patch.object(main.openrouter_client, 'chat_completion', return_value=(response, usage)) as mock_chat:
+        item_lists, usage_stats = main.process_items_batch_with_llm(["milk", "bananas"], "tesco")
+
+    assert len(item_lists) == 2
+    assert item_lists[0][0]["name"] == "Milk"
+    assert item_lists[1][0]["area"] == "produce"
+    assert usage_stats == usage
+    # Both lists travelled in a single LLM call
+    assert mock_chat.call_count == 1
+    prompt = mock_chat.call_args.kwargs["messages"][1]["content"]
+    assert "LIST 1" in prompt and "LIST 2" in prompt
+
+
+def test_process_items_batch_with_llm_missing_list():
+    """A response missing one of the numbered lists raises ValueError."""
+    response = json.dumps({
+        "1": [{"name": "Milk", "quantity": None, "area": "dairy", "area_order": 3}],
+    })
+    usage = {"model": "test", "input_tokens": 1, "output_tokens": 1, "cost": 0.0}
+
+    with patch.object(main.openrouter_client, 'chat_completion', return_value=(response, usage)):
+        with pytest.raises(ValueError):
+            main.process_items_batch_with_llm(["milk", "bananas"], "tesco")
+
+
+def test_batch_scheduler_coalesces_and_fans_out():
+    """Concurrent submits for one supermarket share a call; results fan out."""
+    scheduler = main.BatchScheduler(max_batch=8, max_wait=0.05)
+    usage = {"model": "test", "input_tokens": 1, "output_tokens": 1, "cost": 0.0}
+    lists = [[{"name": "Milk"}], [{"name": "Bread"}]]
+
+    async def run():
+        return await asyncio.gather(
+            scheduler.submit("milk", "tesco"),
+            scheduler.submit("bread", "tesco"),
+        )
+
+    with patch('main.process_items_batch_with_llm', return_value=(lists, usage)) as mock_batch, \
+         patch('main.process_items_with_llm') as mock_single:
+        results = asyncio.run(run())
+
+    assert mock_batch.call_count == 1
+    assert mock_single.call_count == 0
+    assert mock_batch.call_args.args[0] == ["milk", "bread"]
+    assert results[0] == ([{"name": "Milk"}], usage)
+    assert results[1] == ([{"name": "Bread"}], usage)
+
+
+def test_batch_scheduler_propagates_errors():
+    """A failed dispatch rejects every future in the group."""
+    scheduler = main.BatchScheduler(max_batch=8, max_wait=0.01)
+
+    async def run():
+        return await scheduler.submit("milk", "tesco")
+
+    with patch('main.process_items_with_llm', side_effect=RuntimeError("llm down")):
+        with pytest.raises(RuntimeError, match="llm down"):
+            asyncio.run(run())
+
+
+def test_batch_scheduler_dispatches_groups_concurrently():
+    """Different supermarket groups must not be serialized behind each other."""
+    import threading
+
+    scheduler = main.BatchScheduler(max_batch=8, max_wait=0.05)
+    usage = {"model": "test", "input_tokens": 1, "output_tokens": 1, "cost": 0.0}
+    # Both calls must be in flight at once to get past the barrier; if the
+    # worker awaited each group in turn this would time out and break.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_process(items_text, supermarket):
+        barrier.wait()
+        return [{"name": items_text}], usage
+
+    async def run():
+        return await asyncio.gather(
+            scheduler.submit("milk", "tesco"),
+            scheduler.submit("bread", "asda"),
+        )
+
+    with patch('main.process_items_with_llm', side_effect=fake_process):
+        results = asyncio.run(run())
+
+    assert results[0][0] == [{"name": "milk"}]
+    assert results[1][0] == [{"name": "bread"}]
 
 
 # --- PDF Generation Tests ---
@@ -91,25 +209,42 @@ def test_pdf_generation(client, temp_db, mock_list_data):
     # Create list
     list_id = database.create_shopping_list(mock_list_data, "tesco")
 
-    # Mock weasyprint to avoid actual PDF generation dep
-    with patch("main.HTML") as mock_html:
-        mock_html_instance = Mock()
-        mock_html.return_value = mock_html_instance
-        mock_html_instance.write_pdf.return_value = b"%PDF-1.4 mock content"
+    response = client.get(f"/{list_id}.pdf")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert f"filename={list_id}.pdf" in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+    assert "etag" in response.headers
+
+    # A revalidating client should get a 304 without a fresh render
+    cached = client.get(f"/{list_id}.pdf", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_pdf_reflects_update_in_same_second(client, temp_db, mock_list_data):
+    """An update right after a render must invalidate the cached PDF.
+
+    updated_at is only second-granular, so the cache and ETag must key on
+    the revision counter instead — otherwise a render followed by an edit
+    in the same second serves stale bytes and false 304s.
+    """
+    list_id = database.create_shopping_list(mock_list_data, "tesco")
+
+    first = client.get(f"/{list_id}.pdf")
+    assert first.status_code == 200
 
-        response = client.get(f"/{list_id}.pdf")
+    item_id = database.get_items_raw(list_id)[0]['id']
+    assert database.update_item_status(list_id, item_id, True) is not None
 
-        assert response.status_code == 200
-        assert response.headers["content-type"] == "application/pdf"
-        assert f"filename={list_id}.pdf" in response.headers["content-disposition"]
-        assert response.content == b"%PDF-1.4 mock content"
-        
-        # Verify HTML was constructed (mock_html called with string=...)
-        mock_html.assert_called_once()
-        call_kwargs = mock_html.call_args[1]
-        assert "string" in call_kwargs
-        assert "Test Item" in call_kwargs["string"]
-        assert "Tesco" in call_kwargs["string"]
+    second = client.get(f"/{list_id}.pdf")
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.content != first.content
+
+    # The old validator must not 304 against the updated list
+    stale = client.get(f"/{list_id}.pdf", headers={"If-None-Match": first.headers["etag"]})
+    assert stale.status_code == 200
 
 
 def test_pdf_not_found(client, temp_db):
@@ -124,6 +259,32 @@ def test_pdf_invalid_id(client):
     assert response.status_code == 400
 
 
+# --- Edit Op Application Tests ---
+
+def test_apply_edit_ops():
+    """Add, fuzzy remove and replace ops produce the right list and changes."""
+    existing = [
+        {"name": "Semi-skimmed milk", "quantity": "2L", "area": "dairy", "area_order": 3},
+        {"name": "Bananas", "quantity": None, "area": "produce", "area_order": 1},
+        {"name": "Bread", "quantity": None, "area": "bakery", "area_order": 2},
+    ]
+    ops = [
+        {"op": "add", "item": {"name": "Salmon fillets", "quantity": "400g", "area": "meat", "area_order": 4}},
+        {"op": "remove", "match": "milk"},  # substring match
+        {"op": "replace", "match": "Bread", "item": {"name": "Sourdough", "quantity": None, "area": "bakery", "area_order": 2}},
+        {"op": "remove", "match": "caviar"},  # no match: skipped
+    ]
+
+    items, changes = main.apply_edit_ops(existing, ops)
+
+    assert [item["name"] for item in items] == ["Bananas", "Sourdough", "Salmon fillets"]
+    # Replaced item keeps its position and the kept item its categorization
+    assert items[0]["area"] == "produce"
+    assert changes["added"] == ["Salmon fillets", "Sourdough"]
+    assert changes["removed"] == ["Semi-skimmed milk", "Bread"]
+    assert changes["kept"] == ["Bananas"]
+
+
 # --- LLM Error Handling Tests ---
 
 def test_llm_failure_process(client, temp_db):
@@ -156,8 +317,9 @@ def test_llm_invalid_json(client, temp_db):
         assert "Failed to parse LLM response" in response.json()["detail"]
 
 
-def test_ocr_failure(client, temp_db):
-    """Test handling of OCR failure (empty result)."""
+def test_ocr_failure(client, temp_db, monkeypatch):
+    """Test handling of OCR failure (empty result) on the two-stage path."""
+    monkeypatch.setattr(main, "IMAGE_TWO_STAGE", True)
     with patch("main.ocr_image_with_llm") as mock_ocr:
         # Mock OCR returning empty text
         mock_ocr.return_value = ("", {})
@@ -194,7 +356,7 @@ def test_list_versioning(client, temp_db, mock_list_data):
 
 def test_init_db_adds_revision_to_existing_database(temp_db):
     """Test migration of databases created before realtime revisions."""
-    with sqlite3.connect(temp_db) as conn:
+    with sqlite3.connect(temp_db, uri=True) as conn:
         conn.execute("DROP TABLE shopping_items")
         conn.execute("DROP TABLE shopping_lists")
         conn.execute('''
@@ -208,10 +370,12 @@ def test_init_db_adds_revision_to_existing_database(temp_db):
         conn.execute(
             "INSERT INTO shopping_lists (id, supermarket) VALUES ('abc12', 'tesco')"
         )
+        # A genuinely old database predates the schema version stamp
+        conn.execute("PRAGMA user_version=0")
 
     database.init_db()
 
-    with sqlite3.connect(temp_db) as conn:
+    with sqlite3.connect(temp_db, uri=True) as conn:
         columns = {row[1] for row in conn.execute("PRAGMA table_info(shopping_lists)")}
         revision = conn.execute(
             "SELECT revision FROM shopping_lists WHERE id = 'abc12'"
@@ -304,9 +468,8 @@ def test_multi_tab_live_updates_fanout(client, temp_db):
 
         # Verify DB state has both items checked
         updated_list = database.get_shopping_list(list_id)
-        items_by_id = {i['id']: i['checked'] for g in updated_list['groups'] for i in g['items']}
-        assert items_by_id[item1_id] is True
-        assert items_by_id[item2_id] is True
+        assert find_item(updated_list, item1_id)['checked'] is True
+        assert find_item(updated_list, item2_id)['checked'] is True
     finally:
         main.list_event_broker.unsubscribe(list_id, tab1_queue)
         main.list_event_broker.unsubscribe(list_id, tab2_queue)
@@ -4,81 +4,23 @@ Tests for Shoppr shopping list application.
 Run with: pytest test_main.py -v
 """
 
-import json
-import os
-import sqlite3
-import tempfile
-from unittest.mock import Mock, patch, MagicMock
+import base64
+from unittest.mock import patch
 
 import pytest
-from fastapi.testclient import TestClient
 
 import database
 import main
-from main import app
 
 
-@pytest.fixture
-def temp_db():
-    """Create a temporary database for testing."""
-    temp_fd, temp_path = tempfile.mkstemp(suffix=".db")
-    os.close(temp_fd)
+# Shared fixtures (temp_db, client, mock data) live in conftest.py
 
-    # Set the database path
-    original_db_path = database.DB_PATH
-    database.DB_PATH = temp_path
+# Minimal data URL for image endpoints: the LLM is mocked, so production
+# code never decodes the payload on these paths
+FAKE_IMAGE = "data:image/png;base64,AAAA"
 
-    # Initialize the database
-    database.init_db()
-
-    yield temp_path
-
-    # Cleanup
-    database.DB_PATH = original_db_path
-    if os.path.exists(temp_path):
-        os.unlink(temp_path)
-
-
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
-
-
-@pytest.fixture
-def mock_llm_response():
-    """Mock LLM response data for testing."""
-    return [
-        {
-            "name": "Semi-skimmed milk",
-            "quantity": "2L",
-            "area": "dairy",
-            "area_order": 3
-        },
-        {
-            "name": "Bananas",
-            "quantity": "6",
-            "area": "produce",
-            "area_order": 1
-        },
-        {
-            "name": "Bread",
-            "quantity": None,
-            "area": "bakery",
-            "area_order": 2
-        }
-    ]
-
-
-@pytest.fixture
-def mock_llm_usage():
-    """Mock LLM usage stats."""
-    return {
-        "model": "gemini-2.5-flash-lite",
-        "input_tokens": 150,
-        "output_tokens": 75,
-        "cost": 0.000123
-    }
+# Canonical /api/process request body, built once
+PROCESS_BODY = {"text": "milk\nbread\nbananas", "supermarket": "tesco"}
 
 
 # Test 1: Database - Create and retrieve shopping list
@@ -135,14 +77,12 @@ def test_database_update_item_status(temp_db, mock_llm_response):
     revision = database.update_item_status(list_id, item_id, True)
     assert revision == 1
 
-    # Verify update
-    updated_list = database.get_shopping_list(list_id)
+    # Verify update via the flat read (no grouping round-trip needed)
     updated_item = next(
-        item for group in updated_list['groups']
-        for item in group['items']
+        item for item in database.get_items_raw(list_id)
         if item['id'] == item_id
     )
-    assert updated_item['checked'] is True
+    assert updated_item['checked'] == 1
 
     # Test updating non-existent item
     revision = database.update_item_status(list_id, 99999, True)
@@ -156,10 +96,8 @@ def test_database_update_shopping_list(temp_db, mock_llm_response):
     list_id = database.create_shopping_list(mock_llm_response, "tesco")
 
     # Find and check the bananas item specifically
-    list_data = database.get_shopping_list(list_id)
     bananas_item = next(
-        item for group in list_data['groups']
-        for item in group['items']
+        item for item in database.get_items_raw(list_id)
         if 'banana' in item['name'].lower()
     )
     database.update_item_status(list_id, bananas_item['id'], True)
@@ -196,23 +134,19 @@ def test_database_update_shopping_list(temp_db, mock_llm_response):
     revision = database.update_shopping_list(list_id, new_items, changes)
     assert revision == 2
 
-    # Verify update
-    updated_list = database.get_shopping_list(list_id)
-    all_items = [
-        item for group in updated_list['groups']
-        for item in group['items']
-    ]
+    # Verify update via the flat read
+    all_items = database.get_items_raw(list_id)
 
     # Should have 3 items now
     assert len(all_items) == 3
 
     # Bananas should still be checked (preserved status)
     bananas_item = next(item for item in all_items if 'banana' in item['name'].lower())
-    assert bananas_item['checked'] is True
+    assert bananas_item['checked'] == 1
 
     # New eggs should be unchecked
     eggs_item = next(item for item in all_items if 'eggs' in item['name'].lower())
-    assert eggs_item['checked'] is False
+    assert eggs_item['checked'] == 0
 
 
 # Test 4: API - Process text endpoint
@@ -221,13 +155,7 @@ def test_api_process_text(client, temp_db, mock_llm_response, mock_llm_usage):
     with patch('main.process_items_with_llm') as mock_process:
         mock_process.return_value = (mock_llm_response, mock_llm_usage)
 
-        response = client.post(
-            "/api/process",
-            json={
-                "text": "milk\nbread\nbananas",
-                "supermarket": "tesco"
-            }
-        )
+        response = client.post("/api/process", json=PROCESS_BODY)
 
         assert response.status_code == 200
         data = response.json()
@@ -252,7 +180,38 @@ def test_api_process_text(client, temp_db, mock_llm_response, mock_llm_usage):
 
 # Test 5: API - Process image endpoint
 def test_api_process_image(client, temp_db, mock_llm_response, mock_llm_usage):
-    """Test the /api/process-image endpoint for OCR + categorization."""
+    """Test the /api/process-image endpoint (combined OCR + categorization)."""
+    with patch('main.process_image_with_llm') as mock_combined:
+        mock_combined.return_value = ("milk\nbread\nbananas", mock_llm_response, mock_llm_usage)
+
+        response = client.post(
+            "/api/process-image",
+            json={
+                "image": FAKE_IMAGE,
+                "supermarket": "tesco"
+            }
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+
+        # Verify response includes the combined-call metadata
+        assert 'meta' in data
+        assert 'combined' in data['meta']
+        assert data['meta']['combined']['cost'] == 0.000123
+
+        # Verify the vision call received the image
+        mock_combined.assert_called_once()
+        assert mock_combined.call_args.args[0] == FAKE_IMAGE
+
+        # The extracted text is stored for prompt analysis
+        list_data = database.get_shopping_list(data['list_id'])
+        assert list_data is not None
+
+
+def test_api_process_image_two_stage(client, temp_db, mock_llm_response, mock_llm_usage, monkeypatch):
+    """The IMAGE_TWO_STAGE flag restores the separate OCR + planning calls."""
+    monkeypatch.setattr(main, "IMAGE_TWO_STAGE", True)
     mock_ocr_usage = {
         "model": "gemini-2.5-flash",
         "input_tokens": 1200,
@@ -266,13 +225,10 @@ def test_api_process_image(client, temp_db, mock_llm_response, mock_llm_usage):
         mock_ocr.return_value = ("milk\nbread\nbananas", mock_ocr_usage)
         mock_process.return_value = (mock_llm_response, mock_llm_usage)
 
-        # Fake base64 image
-        fake_image = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
-
         response = client.post(
             "/api/process-image",
             json={
-                "image": fake_image,
+                "image": FAKE_IMAGE,
                 "supermarket": "tesco"
             }
         )
@@ -281,16 +237,64 @@ def test_api_process_image(client, temp_db, mock_llm_response, mock_llm_usage):
         data = response.json()
 
         # Verify response includes both OCR and planning metadata
-        assert 'meta' in data
         assert 'ocr' in data['meta']
         assert 'planning' in data['meta']
         assert data['meta']['ocr']['cost'] == 0.000456
         assert data['meta']['planning']['cost'] == 0.000123
 
-        # Verify OCR was called with image
         mock_ocr.assert_called_once()
 
 
+def test_api_process_image_bytes(client, temp_db, mock_llm_response, mock_llm_usage):
+    """Multipart uploads are encoded once and fed to the vision call."""
+    image_bytes = b"\x89PNG fake image bytes"
+
+    with patch('main.process_image_with_llm') as mock_combined:
+        mock_combined.return_value = ("milk\nbread\nbananas", mock_llm_response, mock_llm_usage)
+
+        response = client.post(
+            "/api/process-image-bytes",
+            files={"file": ("list.png", image_bytes, "image/png")},
+            data={"supermarket": "tesco"},
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['supermarket'] == 'tesco'
+    assert 'combined' in data['meta']
+
+    # The handler base64-encodes the upload for the vision call
+    sent = mock_combined.call_args.args[0]
+    assert sent == base64.b64encode(image_bytes).decode('ascii')
+
+
+def test_api_process_image_bytes_empty(client, temp_db):
+    """An empty multipart upload is rejected before any LLM call."""
+    response = client.post(
+        "/api/process-image-bytes",
+        files={"file": ("empty.png", b"", "image/png")},
+    )
+    assert response.status_code == 422
+    assert "Empty image upload" in response.json()['detail']
+
+
+def test_api_process_image_bad_body(client, temp_db):
+    """The raw-body image endpoint rejects malformed and incomplete bodies."""
+    # Body that isn't JSON at all
+    response = client.post(
+        "/api/process-image",
+        content=b"{not json",
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+    assert "Invalid JSON body" in response.json()['detail']
+
+    # Valid JSON without an image field
+    response = client.post("/api/process-image", json={"supermarket": "tesco"})
+    assert response.status_code == 422
+    assert "Missing image field" in response.json()['detail']
+
+
 # Test 6: API - Edit list endpoint
 def test_api_edit_list(client, temp_db, mock_llm_response, mock_llm_usage):
     """Test the /api/list/{list_id}/edit endpoint for natural language editing."""
@@ -401,14 +405,12 @@ def test_api_update_item(client, temp_db, mock_llm_response):
         "checked": True,
     }
 
-    # Verify it was updated
-    list_data = database.get_shopping_list(list_id)
+    # Verify it was updated via the flat read
     updated_item = next(
-        item for group in list_data['groups']
-        for item in group['items']
+        item for item in database.get_items_raw(list_id)
         if item['id'] == item_id
     )
-    assert updated_item['checked'] is True
+    assert updated_item['checked'] == 1
 
     # Test invalid item
     response = client.put(
@@ -419,20 +421,20 @@ def test_api_update_item(client, temp_db, mock_llm_response):
 
 
 # Test 9: Slug validation
-def test_slug_validation():
+@pytest.mark.parametrize("slug,expected", [
+    ("abc12", True),
+    ("zzz99", True),
+    ("00000", True),
+    ("ABC12", False),   # uppercase
+    ("abc-2", False),   # hyphen
+    ("abc_2", False),   # underscore
+    ("abcd", False),    # too short
+    ("abcdef", False),  # too long
+    ("", False),        # empty
+])
+def test_slug_validation(slug, expected):
     """Test the is_valid_slug function."""
-    # Valid slugs
-    assert main.is_valid_slug("abc12") is True
-    assert main.is_valid_slug("zzz99") is True
-    assert main.is_valid_slug("00000") is True
-
-    # Invalid slugs
-    assert main.is_valid_slug("ABC12") is False  # uppercase
-    assert main.is_valid_slug("abc-2") is False  # hyphen
-    assert main.is_valid_slug("abc_2") is False  # underscore
-    assert main.is_valid_slug("abcd") is False   # too short
-    assert main.is_valid_slug("abcdef") is False # too long
-    assert main.is_valid_slug("") is False       # empty
+    assert main.is_valid_slug(slug) is expected
 
 
 # Test 10: Error handling - Invalid supermarket